@@ -0,0 +1,29 @@
+"""Add per-group state version
+
+Revision ID: 0003_add_group_state_version
+Revises: 0002_add_password_auth
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0003_add_group_state_version"
+down_revision = "0002_add_password_auth"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Monotonic counter backing the ETag of GET /groups/{group_id}/state
+    op.add_column(
+        "groups",
+        sa.Column("state_version", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("groups", "state_version")
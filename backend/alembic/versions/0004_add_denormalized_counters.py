@@ -0,0 +1,59 @@
+"""Add denormalized task done counts and group student counts
+
+Revision ID: 0004_add_denormalized_counters
+Revises: 0003_add_group_state_version
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0004_add_denormalized_counters"
+down_revision = "0003_add_group_state_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tasks",
+        sa.Column("done_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "groups",
+        sa.Column("student_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # Backfill. Role is compared as text so this works whichever labels the enum was created with.
+    op.execute(
+        """
+        UPDATE tasks SET done_count = (
+            SELECT count(*)
+            FROM task_status
+            JOIN group_memberships
+              ON group_memberships.user_id = task_status.user_id
+             AND group_memberships.group_id = tasks.group_id
+            WHERE task_status.task_id = tasks.id
+              AND CAST(task_status.status AS TEXT) IN ('DONE', 'EXCUSED')
+              AND lower(CAST(group_memberships.role AS TEXT)) = 'student'
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE groups SET student_count = (
+            SELECT count(*)
+            FROM group_memberships
+            WHERE group_memberships.group_id = groups.id
+              AND lower(CAST(group_memberships.role AS TEXT)) = 'student'
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("groups", "student_count")
+    op.drop_column("tasks", "done_count")
@@ -0,0 +1,56 @@
+"""Add incrementally maintained leaderboard stats
+
+Revision ID: 0005_add_leaderboard_stats
+Revises: 0004_add_denormalized_counters
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = "0005_add_leaderboard_stats"
+down_revision = "0004_add_denormalized_counters"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "leaderboard_stats",
+        sa.Column("group_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("done_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("missed_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("group_id", "user_id", name="pk_leaderboard_stats"),
+        sa.ForeignKeyConstraint(["group_id"], ["groups.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+    )
+
+    # Backfill from history; `python -m workers.backfill_leaderboard` does the same at runtime.
+    op.execute(
+        """
+        INSERT INTO leaderboard_stats (group_id, user_id, done_count, missed_count)
+        SELECT group_id, user_id, sum(done), sum(missed)
+        FROM (
+            SELECT tasks.group_id AS group_id, task_status.user_id AS user_id,
+                   1 AS done, 0 AS missed
+            FROM task_status
+            JOIN tasks ON tasks.id = task_status.task_id
+            WHERE CAST(task_status.status AS TEXT) = 'DONE'
+            UNION ALL
+            SELECT events.group_id, events.target_user_id, 0, 1
+            FROM events
+            WHERE CAST(events.type AS TEXT) = 'TASK_MISSED'
+              AND events.target_user_id IS NOT NULL
+        ) AS history
+        GROUP BY group_id, user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("leaderboard_stats")
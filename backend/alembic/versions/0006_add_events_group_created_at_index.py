@@ -0,0 +1,23 @@
+"""Add composite index for keyset pagination of group events
+
+Revision ID: 0006_add_events_group_created_at_index
+Revises: 0005_add_leaderboard_stats
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0006_add_events_group_created_at_index"
+down_revision = "0005_add_leaderboard_stats"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_events_group_id_created_at", "events", ["group_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_group_id_created_at", table_name="events")
@@ -0,0 +1,54 @@
+"""Add version stamps and task tombstones for delta sync
+
+Revision ID: 0007_add_delta_sync_versions
+Revises: 0006_add_events_group_created_at_index
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = "0007_add_delta_sync_versions"
+down_revision = "0006_add_events_group_created_at_index"
+branch_labels = None
+depends_on = None
+
+_STAMPED = (
+    ("tasks", "changed_version"),
+    ("events", "group_version"),
+    ("leaderboard_stats", "changed_version"),
+)
+
+
+def upgrade() -> None:
+    # NULL means "changed, not yet stamped"; existing rows predate any client's version.
+    for table, column in _STAMPED:
+        op.add_column(table, sa.Column(column, sa.Integer(), nullable=True))
+        op.execute(f"UPDATE {table} SET {column} = 0")
+
+    op.create_index("ix_tasks_group_id_changed_version", "tasks", ["group_id", "changed_version"])
+    op.create_index("ix_events_group_id_group_version", "events", ["group_id", "group_version"])
+
+    op.create_table(
+        "task_tombstones",
+        sa.Column("task_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("group_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["group_id"], ["groups.id"], ondelete="CASCADE"),
+    )
+    op.create_index(
+        "ix_task_tombstones_group_id_version", "task_tombstones", ["group_id", "version"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_tombstones_group_id_version", table_name="task_tombstones")
+    op.drop_table("task_tombstones")
+    op.drop_index("ix_events_group_id_group_version", table_name="events")
+    op.drop_index("ix_tasks_group_id_changed_version", table_name="tasks")
+    for table, column in reversed(_STAMPED):
+        op.drop_column(table, column)
@@ -0,0 +1,36 @@
+"""Add task leases for claim-based deadline workers
+
+Revision ID: 0008_add_task_leases
+Revises: 0007_add_delta_sync_versions
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = "0008_add_task_leases"
+down_revision = "0007_add_delta_sync_versions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Postgres workers claim with FOR UPDATE SKIP LOCKED; the table keeps schemas in step with
+    # SQLite, where it is the claim mechanism.
+    op.create_table(
+        "task_leases",
+        sa.Column("task_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("worker_id", sa.String(length=120), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["task_id"], ["tasks.id"], ondelete="CASCADE"),
+    )
+    op.create_index("ix_task_leases_expires_at", "task_leases", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_leases_expires_at", table_name="task_leases")
+    op.drop_table("task_leases")
@@ -0,0 +1,43 @@
+"""Add partial indexes for pending-penalty task discovery
+
+Revision ID: 0009_add_pending_penalty_indexes
+Revises: 0008_add_task_leases
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0009_add_pending_penalty_indexes"
+down_revision = "0008_add_task_leases"
+branch_labels = None
+depends_on = None
+
+_PENDING = sa.text("penalty_applied_at IS NULL")
+_INDEXES = (
+    ("ix_tasks_pending_penalty_due_at", ["due_at"]),
+    ("ix_tasks_pending_penalty_group_id_due_at", ["group_id", "due_at"]),
+)
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run inside a transaction; it avoids blocking task writes meanwhile.
+    with op.get_context().autocommit_block():
+        for name, columns in _INDEXES:
+            op.create_index(
+                name,
+                "tasks",
+                columns,
+                postgresql_where=_PENDING,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(_INDEXES):
+            op.drop_index(name, table_name="tasks", postgresql_concurrently=True, if_exists=True)
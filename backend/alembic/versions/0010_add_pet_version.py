@@ -0,0 +1,25 @@
+"""Add pets.version for optimistic health writes
+
+Revision ID: 0010_add_pet_version
+Revises: 0009_add_pending_penalty_indexes
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0010_add_pet_version"
+down_revision = "0009_add_pending_penalty_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("pets", sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    op.drop_column("pets", "version")
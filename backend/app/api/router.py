@@ -1,11 +1,15 @@
 from fastapi import APIRouter
 
 from app.api.routes import auth, groups, health, nudges, tasks
+from app.core.config import get_settings
 
 api_router = APIRouter()
 
 api_router.include_router(health.router, tags=["health"])
 api_router.include_router(auth.router, tags=["auth"])
+if get_settings().async_database:
+    # Registered first, so these take their paths over from the sync twins in groups.router.
+    api_router.include_router(groups.async_router, tags=["groups"])
 api_router.include_router(groups.router, tags=["groups"])
 api_router.include_router(tasks.router, tags=["tasks"])
 api_router.include_router(nudges.router, tags=["nudges"])
@@ -9,11 +9,25 @@ from app.db.session import get_db
 from app.models.user import User
 from app.schemas.auth import AuthResponse, LoginRequest, RegisterRequest, UserResponse
 from app.utils.jwt import create_access_token
-from app.utils.password import hash_password, verify_password
+from app.utils.password import (
+    PasswordHasherBusy,
+    hash_password,
+    needs_rehash,
+    verify_password,
+)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def _busy(e: PasswordHasherBusy) -> HTTPException:
+    # Shed load instead of queueing behind a burst of logins; clients retry after the hint.
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins right now. Please try again in a moment.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
 @router.post("/register", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
 def register(
     body: RegisterRequest,
@@ -40,7 +54,10 @@ def register(
         )
 
     # Create new user
-    password_hash = hash_password(body.password)
+    try:
+        password_hash = hash_password(body.password)
+    except PasswordHasherBusy as e:
+        raise _busy(e) from e
     user = User(
         email=email,
         display_name=body.display_name.strip(),
@@ -99,13 +116,26 @@ def login(
             detail="This account needs to be set up. Please register with a password.",
         )
     
-    if not verify_password(body.password, user.password_hash):
+    try:
+        password_ok = verify_password(body.password, user.password_hash)
+    except PasswordHasherBusy as e:
+        raise _busy(e) from e
+    if not password_ok:
         # Email exists but password is wrong
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password. Please try again.",
         )
 
+    if needs_rehash(user.password_hash):
+        # Move the stored hash to the current cost while we have the plain password.
+        # Best effort: a saturated hasher just leaves it for the next login.
+        try:
+            user.password_hash = hash_password(body.password)
+            db.commit()
+        except PasswordHasherBusy:
+            pass
+
     # Create access token
     access_token = create_access_token(data={"sub": str(user.id), "email": user.email})
 
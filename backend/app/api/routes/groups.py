@@ -1,14 +1,32 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+import json
+import logging
+import uuid
+from collections.abc import AsyncIterator, Iterable
+from typing import Optional, Union
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import delete, select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
-from app.deps.auth import CurrentUser, get_current_user
+from app.core.config import get_settings
+from app.db.session import SessionLocal, get_async_db, get_db
+from app.deps.auth import (
+    CurrentUser,
+    get_current_user,
+    get_current_user_async,
+    resolve_user_from_stream_token,
+    resolve_user_from_token,
+    security,
+)
 from app.models.class_ import Class
-from app.models.enums import EventType, GroupRole
+from app.models.enums import EventType, GroupMode, GroupRole
 from app.models.event import Event
 from app.models.group import Group
 from app.models.group_membership import GroupMembership
@@ -20,19 +38,58 @@ from app.schemas.groups import (
     JoinGroupRequest,
     JoinGroupResponse,
     MyGroupsResponse,
+    StreamTokenResponse,
+)
+from app.schemas.state import EventPage, GroupStateDelta, GroupStateResponse
+from app.services.auth_cache import forget_group, forget_membership
+from app.services.authz import require_group_membership, require_group_membership_async
+from app.services.counters import adjust_group_student_count
+from app.services.deadline_penalties import (
+    apply_deadline_penalties_coalesced,
+    apply_deadline_penalties_for_groups,
+    pending_penalty_groups,
 )
-from app.schemas.state import GroupStateResponse
-from app.services.authz import require_group_membership
-from app.services.deadline_penalties import apply_deadline_penalties_for_group
-from app.services.group_state import build_group_state
+from app.services.event_feed import EVENT_PAGE_DEFAULT, EVENT_PAGE_MAX, list_group_events
+from app.services.group_state import build_group_state, build_group_state_async
+from app.services.group_versions import (
+    bump_group_version,
+    group_state_etag,
+    mark_group_tasks_changed,
+)
+from app.services.leaderboard import ensure_leaderboard_row
+from app.services.live_updates import LiveUpdateHub, get_live_update_hub
+from app.services.penalty_queue import PenaltyQueue, get_penalty_queue
+from app.utils.etags import if_none_match_matches
 from app.utils.invite_codes import generate_invite_code
+from app.utils.jwt import create_stream_token
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/groups")
+# Async twins of the hottest reads, mounted ahead of `router` when ASYNC_DATABASE=true.
+async_router = APIRouter(prefix="/groups")
+settings = get_settings()
 
 
-def _serialize_group_summary(group: Group, role: GroupRole, klass: Class, db: Session, user: CurrentUser) -> GroupSummary:
-    # Get pet health for preview
-    pet = db.scalar(select(Pet).where(Pet.group_id == group.id))
+def _queue_penalties(
+    penalty_queue: PenaltyQueue, group_ids: Iterable[uuid.UUID]
+) -> list[uuid.UUID]:
+    """Queue a pass per group; returns the groups the (full) queue refused, to run inline."""
+    refused = [group_id for group_id in group_ids if not penalty_queue.request(group_id)]
+    if refused:
+        logger.warning("Penalty queue full; applying %d group(s) inline", len(refused))
+    return refused
+
+
+def _serialize_group_summary(
+    group: Group,
+    role: GroupRole,
+    klass: Class,
+    pet: Optional[Pet],
+    user: CurrentUser,
+    penalties_pending: bool = False,
+) -> GroupSummary:
+    # Pet health for preview
     pet_health = pet.health if pet else None
     pet_max_health = pet.max_health if pet else None
     
@@ -49,6 +106,7 @@ def _serialize_group_summary(group: Group, role: GroupRole, klass: Class, db: Se
         pet_health=pet_health,
         pet_max_health=pet_max_health,
         is_creator=is_creator,
+        penalties_pending=penalties_pending,
     )
 
 
@@ -93,16 +151,25 @@ def create_group(
     role = GroupRole.INSTRUCTOR if body.mode.value == "INSTRUCTOR" else GroupRole.STUDENT
     membership = GroupMembership(group_id=group.id, user_id=user.id, role=role)
     db.add(membership)
+    group.student_count = 1 if role == GroupRole.STUDENT else 0
 
     initial_hp = max(1, min(1000, int(body.initial_health)))  # Clamp between 1 and 1000
     pet = Pet(group_id=group.id, name="Pibble", health=initial_hp, max_health=initial_hp)
     db.add(pet)
 
-    db.add(Event(group_id=group.id, type=EventType.GROUP_CREATED, actor_user_id=user.id))
+    # The group starts at its initial version, so stamp the first event with it directly.
+    db.add(
+        Event(
+            group_id=group.id,
+            type=EventType.GROUP_CREATED,
+            actor_user_id=user.id,
+            group_version=group.state_version,
+        )
+    )
 
     db.commit()
 
-    return CreateGroupResponse(group=_serialize_group_summary(group, role=role, klass=klass, db=db, user=user))
+    return CreateGroupResponse(group=_serialize_group_summary(group, role=role, klass=klass, pet=pet, user=user))
 
 
 @router.post("/join", response_model=JoinGroupResponse)
@@ -127,6 +194,13 @@ def join_group(
         membership = GroupMembership(group_id=group.id, user_id=user.id, role=GroupRole.STUDENT)
         db.add(membership)
         db.add(Event(group_id=group.id, type=EventType.MEMBER_JOINED, actor_user_id=user.id))
+        adjust_group_student_count(db, group.id, 1)
+        # total_count changed on every task; new students show up on the leaderboard.
+        mark_group_tasks_changed(db, group.id)
+        if group.mode == GroupMode.FRIEND:
+            ensure_leaderboard_row(db, group.id, user.id)
+        bump_group_version(db, group.id)
+        forget_membership(db, group.id, user.id)
         db.commit()
         role = membership.role
     else:
@@ -134,15 +208,34 @@ def join_group(
 
     klass = db.scalar(select(Class).where(Class.id == group.class_id))
     assert klass is not None
+    pet = db.scalar(select(Pet).where(Pet.group_id == group.id))
 
-    return JoinGroupResponse(group=_serialize_group_summary(group, role=role, klass=klass, db=db, user=user))
+    return JoinGroupResponse(group=_serialize_group_summary(group, role=role, klass=klass, pet=pet, user=user))
 
 
-@router.get("/my", response_model=MyGroupsResponse)
+@router.get(
+    "/my", response_model=MyGroupsResponse, include_in_schema=not settings.async_database
+)
 def my_groups(
     db: Session = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
 ) -> MyGroupsResponse:
+    # Apply deadline penalties across all of the user's groups first, so pet health in the
+    # preview matches what you see when clicking into the group. This runs before loading the
+    # rows below because its commit would otherwise expire them. In background mode the
+    # groups are only queued and flagged instead.
+    my_group_ids = select(GroupMembership.group_id).where(GroupMembership.user_id == user.id)
+    penalty_queue = get_penalty_queue()
+    pending: set[uuid.UUID] = set()
+    if penalty_queue is None:
+        apply_deadline_penalties_for_groups(db, my_group_ids)
+    else:
+        pending = pending_penalty_groups(db, my_group_ids)
+        refused = _queue_penalties(penalty_queue, pending)
+        if refused:
+            apply_deadline_penalties_for_groups(db, refused)
+            pending.difference_update(refused)
+
     rows = db.execute(
         select(Group, GroupMembership, Class)
         .join(GroupMembership, GroupMembership.group_id == Group.id)
@@ -151,13 +244,20 @@ def my_groups(
         .order_by(Group.created_at.desc())
     ).all()
 
-    # Apply deadline penalties for each group to ensure pet health is up-to-date
-    # This ensures the preview matches what you see when clicking into the group
-    for (g, _, _) in rows:
-        apply_deadline_penalties_for_group(db, group_id=str(g.id))
+    pets = {
+        p.group_id: p
+        for p in db.scalars(select(Pet).where(Pet.group_id.in_([g.id for (g, _, _) in rows])))
+    }
 
     groups = [
-        _serialize_group_summary(group=g, role=m.role, klass=c, db=db, user=user)
+        _serialize_group_summary(
+            group=g,
+            role=m.role,
+            klass=c,
+            pet=pets.get(g.id),
+            user=user,
+            penalties_pending=g.id in pending,
+        )
         for (g, m, c) in rows
     ]
     return MyGroupsResponse(groups=groups)
@@ -171,6 +271,7 @@ def delete_group(
 ) -> dict:
     """Delete a group. Only the creator can delete it."""
     import uuid
+
     from fastapi import HTTPException, status
     
     try:
@@ -209,6 +310,10 @@ def delete_group(
     for membership in memberships:
         db.delete(membership)
     
+    # Delete leaderboard aggregates
+    from app.models.leaderboard_stat import LeaderboardStat
+    db.execute(delete(LeaderboardStat).where(LeaderboardStat.group_id == group_uuid))
+
     # Delete the pet
     pet = db.scalar(select(Pet).where(Pet.group_id == group_uuid))
     if pet:
@@ -216,18 +321,258 @@ def delete_group(
     
     # Finally delete the group itself
     db.delete(group)
+    forget_group(db, group_uuid)
     db.commit()
     return {"ok": True}
 
 
-@router.get("/{group_id}/state", response_model=GroupStateResponse)
+@router.get(
+    "/{group_id}/state",
+    response_model=Union[GroupStateResponse, GroupStateDelta],
+    responses={304: {"description": "State unchanged since the supplied ETag"}},
+    include_in_schema=not settings.async_database,
+)
 def group_state(
     group_id: str,
+    response: Response,
+    since: Optional[int] = Query(
+        None, ge=0, description="Last version the client has; returns a delta when possible"
+    ),
     db: Session = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
-) -> GroupStateResponse:
+    if_none_match: Optional[str] = Header(None),
+):
     ctx = require_group_membership(db, group_id=group_id, user=user)
-    # Apply deadline penalties before building state (for demo convenience)
-    apply_deadline_penalties_for_group(db, group_id=ctx.group.id)
-    return build_group_state(db, group=ctx.group, viewer=user)
+    penalty_queue = get_penalty_queue()
+    penalties_pending = False
+    if penalty_queue is None:
+        # Apply deadline penalties before building state (for demo convenience)
+        if apply_deadline_penalties_coalesced(db, group_id=ctx.group.id):
+            db.refresh(ctx.group)
+    elif pending_penalty_groups(db, [ctx.group.id]):
+        # Serve the current state now; the pass lands as a new version (pushed to streams).
+        penalties_pending = True
+        if _queue_penalties(penalty_queue, [ctx.group.id]):
+            if apply_deadline_penalties_coalesced(db, group_id=ctx.group.id):
+                db.refresh(ctx.group)
+            penalties_pending = False
+
+    # The version is read before the state is built, so a concurrent write can only make the
+    # body newer than its tag (costing one extra 200 later), never older.
+    etag = group_state_etag(ctx.group, viewer_id=user.id, penalties_pending=penalties_pending)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if if_none_match_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    response.headers.update(cache_headers)
+    state = build_group_state(db, group=ctx.group, viewer=user, since=since)
+    if penalties_pending:
+        state = state.model_copy(update={"penalties_pending": True})
+    return state
+
+
+@router.get("/{group_id}/events", response_model=EventPage)
+def group_events(
+    group_id: str,
+    before: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(EVENT_PAGE_DEFAULT, ge=1, le=EVENT_PAGE_MAX),
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    ctx = require_group_membership(db, group_id=group_id, user=user)
+    try:
+        return list_group_events(db, group=ctx.group, before=before, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+
+@router.post("/{group_id}/stream-token", response_model=StreamTokenResponse)
+def create_group_stream_token(
+    group_id: str,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """A short-lived token that opens this group's stream (`?stream_token=`), and nothing else."""
+    ctx = require_group_membership(db, group_id=group_id, user=user)
+    return StreamTokenResponse(
+        stream_token=create_stream_token(user.id, ctx.group.id),
+        expires_in=settings.stream_token_ttl_seconds,
+    )
+
+
+def _authorize_group_stream(group_id: str, token: str, scoped: bool) -> uuid.UUID:
+    # Streams stay open for minutes, so auth uses its own short-lived session instead of
+    # holding a pooled connection for the lifetime of the response.
+    with SessionLocal() as db:
+        if scoped:
+            user = resolve_user_from_stream_token(db, token, group_id)
+        else:
+            user = resolve_user_from_token(db, token)
+        ctx = require_group_membership(db, group_id=group_id, user=user)
+        return ctx.group.id
+
+
+def _read_state_version(group_id: uuid.UUID) -> Optional[int]:
+    with SessionLocal() as db:
+        return db.scalar(select(Group.state_version).where(Group.id == group_id))
+
+
+def _sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def _group_event_stream(
+    request: Request, hub: LiveUpdateHub, group_id: uuid.UUID
+) -> AsyncIterator[str]:
+    heartbeat = settings.live_updates_heartbeat_seconds
+    with hub.subscribe(group_id) as sub:
+        # Read the version only once subscribed: a commit landing in between is then either
+        # in this read or delivered to `sub`, never lost.
+        version = await run_in_threadpool(_read_state_version, group_id)
+        if version is None:
+            return  # group deleted meanwhile
+        # Announce the current version; the client refetches when it differs from its own.
+        yield _sse("version", {"version": version}, event_id=version)
+        while not await request.is_disconnected():
+            new_version = await sub.next_version(timeout=heartbeat)
+            if new_version is None:
+                yield ": keepalive\n\n"
+            elif new_version > version:
+                version = new_version
+                yield _sse("version", {"version": version}, event_id=version)
+
+
+@router.get("/{group_id}/stream")
+async def group_stream(
+    group_id: str,
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    stream_token: Optional[str] = Query(None),
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of state-version changes for one group.
+
+    EventSource cannot set headers, so browsers pass `?stream_token=` from
+    POST /groups/{group_id}/stream-token instead; login tokens are only accepted as a header.
+    """
+    token = credentials.credentials if credentials else stream_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required. Please login or register.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    group_uuid = await run_in_threadpool(
+        _authorize_group_stream, group_id, token, credentials is None
+    )
+    return StreamingResponse(
+        _group_event_stream(request, get_live_update_hub(), group_uuid),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- Async routes (ASYNC_DATABASE=true) ------------------------------------------------------
+# Same responses as my_groups / group_state, but waiting on the database does not hold a
+# threadpool thread. Inline penalty passes (writes) still run on the sync engine in the
+# threadpool; once a group is caught up they are skipped after one read-only check.
+
+
+def _apply_penalties_now(group_id: uuid.UUID) -> int:
+    with SessionLocal() as db:
+        return apply_deadline_penalties_coalesced(db, group_id=group_id)
+
+
+def _apply_penalties_for_groups_now(group_ids: list[uuid.UUID]) -> None:
+    with SessionLocal() as db:
+        apply_deadline_penalties_for_groups(db, group_ids)
+
+
+@async_router.get("/my", response_model=MyGroupsResponse)
+async def my_groups_async(
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user_async),
+) -> MyGroupsResponse:
+    my_group_ids = select(GroupMembership.group_id).where(GroupMembership.user_id == user.id)
+    pending = await db.run_sync(pending_penalty_groups, my_group_ids)
+    penalty_queue = get_penalty_queue()
+    if pending and penalty_queue is None:
+        await run_in_threadpool(_apply_penalties_for_groups_now, list(pending))
+        pending = set()
+    elif pending:
+        refused = _queue_penalties(penalty_queue, pending)
+        if refused:
+            await run_in_threadpool(_apply_penalties_for_groups_now, refused)
+            pending.difference_update(refused)
+
+    rows = (
+        await db.execute(
+            select(Group, GroupMembership, Class)
+            .join(GroupMembership, GroupMembership.group_id == Group.id)
+            .join(Class, Class.id == Group.class_id)
+            .where(GroupMembership.user_id == user.id)
+            .order_by(Group.created_at.desc())
+        )
+    ).all()
+    pets = {
+        p.group_id: p
+        for p in await db.scalars(select(Pet).where(Pet.group_id.in_([g.id for (g, _, _) in rows])))
+    }
+
+    groups = [
+        _serialize_group_summary(
+            group=g,
+            role=m.role,
+            klass=c,
+            pet=pets.get(g.id),
+            user=user,
+            penalties_pending=g.id in pending,
+        )
+        for (g, m, c) in rows
+    ]
+    return MyGroupsResponse(groups=groups)
+
+
+@async_router.get(
+    "/{group_id}/state",
+    response_model=Union[GroupStateResponse, GroupStateDelta],
+    responses={304: {"description": "State unchanged since the supplied ETag"}},
+)
+async def group_state_async(
+    group_id: str,
+    response: Response,
+    since: Optional[int] = Query(
+        None, ge=0, description="Last version the client has; returns a delta when possible"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user_async),
+    if_none_match: Optional[str] = Header(None),
+):
+    ctx = await require_group_membership_async(db, group_id=group_id, user=user)
+    penalty_queue = get_penalty_queue()
+    penalties_pending = False
+    if await db.run_sync(pending_penalty_groups, [ctx.group.id]):
+        if penalty_queue is None:
+            if await run_in_threadpool(_apply_penalties_now, ctx.group.id):
+                await db.refresh(ctx.group)
+        elif _queue_penalties(penalty_queue, [ctx.group.id]):
+            if await run_in_threadpool(_apply_penalties_now, ctx.group.id):
+                await db.refresh(ctx.group)
+        else:
+            penalties_pending = True
+
+    etag = group_state_etag(ctx.group, viewer_id=user.id, penalties_pending=penalties_pending)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if if_none_match_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers)
 
+    response.headers.update(cache_headers)
+    state = await build_group_state_async(db, group=ctx.group, viewer=user, since=since)
+    if penalties_pending:
+        state = state.model_copy(update={"penalties_pending": True})
+    return state
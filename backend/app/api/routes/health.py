@@ -1,6 +1,21 @@
-from fastapi import APIRouter
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 
 from app.core.config import get_settings
+from app.db.session import pool_stats
+from app.deps.auth import security
+from app.services.auth_cache import get_auth_cache
+from app.services.live_updates import get_live_update_hub
+from app.services.penalty_queue import get_penalty_queue
+from app.services.pet_health import pet_write_stats
+from app.services.state_cache import get_group_snapshot_cache
+from app.utils.jwks import get_jwks_cache
+from app.utils.jwt import verified_token_cache_stats
+from app.utils.password import get_password_hasher
+from app.utils.single_flight import single_flight_stats
 
 router = APIRouter()
 settings = get_settings()
@@ -15,3 +30,46 @@ def health() -> dict:
         "cors_origin_regex": settings.cors_allow_origin_regex,
     }
 
+
+
+def require_metrics_access(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+) -> None:
+    """
+    Metrics expose cache, auth and pool internals: they need `Bearer <METRICS_TOKEN>`, or,
+    without a token configured, ENV=dev (elsewhere the endpoint does not exist).
+    """
+    if not settings.metrics_token:
+        if settings.env != "dev":
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+        return
+    supplied = credentials.credentials if credentials else ""
+    if not secrets.compare_digest(supplied.encode(), settings.metrics_token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Metrics token required.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get(
+    "/health/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_access)]
+)
+def metrics() -> dict:
+    """In-process cache and fan-out counters (per worker process)."""
+    snapshots = get_group_snapshot_cache()
+    penalty_queue = get_penalty_queue()
+    auth_cache = get_auth_cache()
+    jwks = get_jwks_cache()
+    return {
+        "state_cache": snapshots.stats() if snapshots is not None else None,
+        "live_updates": get_live_update_hub().stats(),
+        "single_flight": single_flight_stats(),
+        "penalty_queue": penalty_queue.stats() if penalty_queue is not None else None,
+        "pet_writes": pet_write_stats.stats(),
+        "auth_cache": auth_cache.stats() if auth_cache is not None else None,
+        "jwt_cache": verified_token_cache_stats(),
+        "jwks": jwks.stats() if jwks is not None else None,
+        "password_hasher": get_password_hasher().stats(),
+        "db_pool": pool_stats(),
+    }
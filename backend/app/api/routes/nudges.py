@@ -3,7 +3,6 @@ from __future__ import annotations
 import uuid
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
@@ -13,6 +12,7 @@ from app.models.event import Event
 from app.models.group_membership import GroupMembership
 from app.schemas.nudges import NudgeRequest, NudgeResponse
 from app.services.authz import ensure_nudges_allowed, require_group_membership
+from app.services.group_versions import bump_group_version
 
 router = APIRouter(prefix="/groups/{group_id}/nudges")
 
@@ -46,12 +46,7 @@ def send_nudge(
             ) from e
 
     # recipient must be in group
-    recipient_membership = db.scalar(
-        select(GroupMembership).where(
-            GroupMembership.group_id == ctx.group.id,
-            GroupMembership.user_id == to_user_uuid,
-        )
-    )
+    recipient_membership = db.get(GroupMembership, (ctx.group.id, to_user_uuid))
     if recipient_membership is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -68,6 +63,7 @@ def send_nudge(
             message=body.message,
         )
     )
+    bump_group_version(db, ctx.group.id)
     db.commit()
     return NudgeResponse(ok=True)
 
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import uuid
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -11,8 +10,6 @@ from app.db.session import get_db
 from app.deps.auth import CurrentUser, get_current_user
 from app.models.enums import EventType, GroupRole, TaskStatusValue, TaskType
 from app.models.event import Event
-from app.models.group import Group
-from app.models.pet import Pet
 from app.models.task import Task
 from app.models.task_status import TaskStatus
 from app.schemas.tasks import CompleteTaskRequest, CreateTaskRequest, TaskOut, UpdateTaskRequest
@@ -20,29 +17,18 @@ from app.services.authz import (
     require_can_create_tasks,
     require_group_membership,
     require_instructor_or_creator,
+    require_task_membership,
 )
+from app.services.counters import adjust_task_done_count, counts_as_done
+from app.services.deadline_scheduler import notify_deadline
+from app.services.group_versions import bump_group_version, record_task_deleted
+from app.services.leaderboard import add_leaderboard_counts, forget_task_completions
+from app.services.pet_health import adjust_pet_health
 from app.utils.grades import compute_grade_health_delta
 
 router = APIRouter()
 
 
-def _get_task_and_group(db: Session, task_id: str) -> tuple[Task, Group]:
-    try:
-        task_uuid = uuid.UUID(task_id)
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid task id",
-        ) from e
-
-    task = db.scalar(select(Task).where(Task.id == task_uuid))
-    if task is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    group = db.scalar(select(Group).where(Group.id == task.group_id))
-    assert group is not None
-    return task, group
-
-
 @router.post("/groups/{group_id}/tasks", response_model=TaskOut)
 def create_task(
     group_id: str,
@@ -63,6 +49,7 @@ def create_task(
     )
     db.add(task)
     db.flush()
+    notify_deadline(db, task.due_at)
 
     db.add(
         Event(
@@ -72,6 +59,7 @@ def create_task(
             task_id=task.id,
         )
     )
+    bump_group_version(db, ctx.group.id)
     db.commit()
 
     return TaskOut(
@@ -91,8 +79,8 @@ def update_task(
     db: Session = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
 ) -> TaskOut:
-    task, group = _get_task_and_group(db, task_id)
-    ctx = require_group_membership(db, group_id=str(group.id), user=user)
+    ctx = require_task_membership(db, task_id=task_id, user=user)
+    task, group = ctx.task, ctx.group
     # creator or instructor
     if task.created_by_id != user.id:
         require_instructor_or_creator(ctx, user)
@@ -101,11 +89,14 @@ def update_task(
         task.title = body.title
     if body.type is not None:
         task.type = body.type
-    if body.due_at is not None:
+    if body.due_at is not None and body.due_at != task.due_at:
         task.due_at = body.due_at
+        notify_deadline(db, task.due_at)
     if body.penalty is not None:
         task.penalty = body.penalty
 
+    task.changed_version = None
+    bump_group_version(db, group.id)
     db.commit()
     db.refresh(task)
 
@@ -125,12 +116,15 @@ def delete_task(
     db: Session = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
 ) -> dict:
-    task, group = _get_task_and_group(db, task_id)
-    ctx = require_group_membership(db, group_id=str(group.id), user=user)
+    ctx = require_task_membership(db, task_id=task_id, user=user)
+    task, group = ctx.task, ctx.group
     if task.created_by_id != user.id:
         require_instructor_or_creator(ctx, user)
 
+    forget_task_completions(db, task)
+    record_task_deleted(db, task)
     db.delete(task)
+    bump_group_version(db, group.id)
     db.commit()
     return {"ok": True}
 
@@ -142,8 +136,8 @@ def complete_task(
     db: Session = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
 ) -> dict:
-    task, group = _get_task_and_group(db, task_id)
-    ctx = require_group_membership(db, group_id=str(group.id), user=user)
+    ctx = require_task_membership(db, task_id=task_id, user=user)
+    task = ctx.task
 
     # EXCUSED is only allowed in INSTRUCTOR mode by instructors.
     if body.status == TaskStatusValue.EXCUSED:
@@ -161,6 +155,9 @@ def complete_task(
     existing = db.scalar(
         select(TaskStatus).where(TaskStatus.task_id == task.id, TaskStatus.user_id == user.id)
     )
+    old_status = existing.status if existing is not None else None
+    # Only students count toward task.done_count.
+    counts_for_task = ctx.membership.role == GroupRole.STUDENT
 
     # Handle grade and health delta for exams and assignments
     grade_letter = None
@@ -174,10 +171,14 @@ def complete_task(
             old_health_delta = existing.health_delta or 0
             if old_health_delta != 0:
                 # Revert health change
-                pet = db.scalar(select(Pet).where(Pet.group_id == task.group_id))
-                if pet is not None:
-                    pet.health = max(0, min(pet.max_health, pet.health - old_health_delta))
+                adjust_pet_health(db, task.group_id, -old_health_delta)
             db.delete(existing)
+            if counts_for_task and counts_as_done(old_status):
+                adjust_task_done_count(db, task.id, -1)
+            if old_status == TaskStatusValue.DONE:
+                add_leaderboard_counts(db, task.group_id, {user.id: (-1, 0)})
+            task.changed_version = None
+            bump_group_version(db, task.group_id)
             db.commit()
         return {"ok": True}
 
@@ -231,13 +232,10 @@ def complete_task(
     if existing is not None:
         old_health_delta = existing.health_delta or 0
 
-    # Apply health change
-    if health_delta != 0 or old_health_delta != 0:
-        pet = db.scalar(select(Pet).where(Pet.group_id == task.group_id))
-        if pet is not None:
-            # Revert old delta, apply new delta
-            net_delta = health_delta - old_health_delta
-            pet.health = max(0, min(pet.max_health, pet.health + net_delta))
+    # Apply health change: revert old delta, apply new delta (atomically, in the database)
+    net_delta = health_delta - old_health_delta
+    if net_delta != 0:
+        adjust_pet_health(db, task.group_id, net_delta)
 
     now = datetime.now(timezone.utc)
     if existing is None:
@@ -259,6 +257,13 @@ def complete_task(
         existing.grade_percent = grade_percent
         existing.health_delta = health_delta
 
+    if counts_for_task:
+        adjust_task_done_count(
+            db, task.id, int(counts_as_done(body.status)) - int(counts_as_done(old_status))
+        )
+    done_delta = int(body.status == TaskStatusValue.DONE) - int(old_status == TaskStatusValue.DONE)
+    add_leaderboard_counts(db, task.group_id, {user.id: (done_delta, 0)})
+
     if body.status == TaskStatusValue.DONE:
         event_delta = health_delta if health_delta != 0 else None
         event_message = f"Grade: {grade_letter}" if grade_letter else None
@@ -273,6 +278,8 @@ def complete_task(
             )
         )
 
+    task.changed_version = None
+    bump_group_version(db, task.group_id)
     db.commit()
     return {"ok": True}
 
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def dialect_name(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def insert_for(db: Session):
+    """The dialect's insert() construct, which supports ON CONFLICT and RETURNING."""
+    if dialect_name(db) == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
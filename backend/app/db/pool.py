@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import Engine, event, exc
+from sqlalchemy.pool import Pool
+
+from app.utils.latency import LatencyHistogram
+
+_registry: dict[str, PoolStats] = {}
+_registry_lock = threading.Lock()
+
+
+class PoolStats:
+    """Checkout counters and latency histograms for one engine's pool (per process)."""
+
+    def __init__(self, name: str, max_overflow: int) -> None:
+        self.name = name
+        self.max_overflow = max_overflow
+        self._lock = threading.Lock()
+        self._counts = {
+            "checkouts": 0,
+            "waited": 0,  # checkouts that found every connection in use
+            "timeouts": 0,
+            "connects": 0,
+            "invalidated": 0,
+            "idle_pings": 0,
+            "stale_connections": 0,
+        }
+        self._waiting = 0
+        self._max_waiting = 0
+        self.wait = LatencyHistogram()  # checkouts that had to wait for a connection
+        self.checkout = LatencyHistogram()  # every checkout, connecting and pings included
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def begin_wait(self) -> None:
+        with self._lock:
+            self._counts["waited"] += 1
+            self._waiting += 1
+            self._max_waiting = max(self._max_waiting, self._waiting)
+
+    def end_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._waiting -= 1
+        self.wait.observe(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = {
+                **self._counts,
+                "waiting": self._waiting,
+                "max_waiting": self._max_waiting,
+            }
+        return {**counters, "wait": self.wait.stats(), "checkout": self.checkout.stats()}
+
+
+class _TimedCheckout:
+    """Mixin for a QueuePool subclass: times Pool.connect() into the class's `pool_stats`."""
+
+    pool_stats: PoolStats
+
+    def connect(self):  # type: ignore[no-untyped-def]
+        stats = self.pool_stats
+        # No free connection and no overflow left: this checkout queues for one.
+        free = self.checkedin()  # type: ignore[attr-defined]
+        exhausted = free == 0 and self.overflow() >= stats.max_overflow  # type: ignore[attr-defined]
+        if exhausted:
+            stats.begin_wait()
+        started = time.perf_counter()
+        try:
+            return super().connect()  # type: ignore[misc]
+        except exc.TimeoutError:
+            stats.count("timeouts")
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if exhausted:
+                stats.end_wait(elapsed)
+            stats.count("checkouts")
+            stats.checkout.observe(elapsed)
+
+
+def timed_pool_class(base: type[Pool], name: str, max_overflow: int) -> type[Pool]:
+    """`base` with checkout timing into the stats registered under `name`."""
+    with _registry_lock:
+        stats = _registry.setdefault(name, PoolStats(name, max_overflow))
+    # A class attribute, so stats survive Pool.recreate() (dispose, invalidation).
+    return type(f"Timed{base.__name__}", (_TimedCheckout, base), {"pool_stats": stats})
+
+
+def install_pool_events(engine: Engine) -> None:
+    """Count new and invalidated connections of a timed pool."""
+    stats = getattr(engine.pool, "pool_stats", None)
+    if not isinstance(stats, PoolStats):
+        return
+
+    @event.listens_for(engine, "connect")
+    def _connected(dbapi_connection: Any, record: Any) -> None:
+        stats.count("connects")
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidated(dbapi_connection: Any, record: Any, exception: Any) -> None:
+        stats.count("invalidated")
+
+
+def install_idle_pre_ping(engine: Engine, idle_seconds: float) -> None:
+    """Ping a connection on checkout only if it sat in the pool for `idle_seconds` or more."""
+    stats = getattr(engine.pool, "pool_stats", None)
+
+    @event.listens_for(engine, "checkin")
+    def _mark_idle(dbapi_connection: Any, record: Any) -> None:
+        record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _ping_if_idle(dbapi_connection: Any, record: Any, proxy: Any) -> None:
+        checked_in_at = record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        if stats is not None:
+            stats.count("idle_pings")
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception as e:
+            if stats is not None:
+                stats.count("stale_connections")
+            # The pool discards this connection and retries the checkout with a fresh one.
+            raise exc.DisconnectionError() from e
+        finally:
+            try:
+                cursor.close()
+            except Exception:  # noqa: BLE001
+                pass
+
+
+def pool_status(engine: Engine) -> dict:
+    """Current occupancy plus the timing stats of the engine's pool."""
+    pool = engine.pool
+    status: dict[str, Any] = {"class": type(pool).__name__}
+    stats = getattr(pool, "pool_stats", None)
+    if isinstance(stats, PoolStats):
+        status.update(
+            size=pool.size(),  # type: ignore[attr-defined]
+            checked_out=pool.checkedout(),  # type: ignore[attr-defined]
+            checked_in=pool.checkedin(),  # type: ignore[attr-defined]
+            overflow=max(pool.overflow(), 0),  # type: ignore[attr-defined]
+            max_overflow=stats.max_overflow,
+            timeout_seconds=pool.timeout(),  # type: ignore[attr-defined]
+            **stats.snapshot(),
+        )
+    return status
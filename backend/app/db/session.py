@@ -2,29 +2,55 @@ from __future__ import annotations
 
 import sys
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
 
 from app.core.config import get_settings
+from app.db.pool import install_idle_pre_ping, install_pool_events, pool_status, timed_pool_class
 
 settings = get_settings()
 
 requested_url = settings.database_url
 
 
-def _make_engine(url: str):
-    if url.startswith("sqlite"):
-        return create_engine(
-            url,
-            connect_args={"check_same_thread": False},
-            pool_pre_ping=True,
-        )
-    # Postgres/other
-    return create_engine(
-        url,
-        connect_args={"connect_timeout": 2},
-        pool_pre_ping=True,
+def _pool_options(url: URL, base: type[Pool], name: str) -> dict:
+    """Pool sizing and pre-ping for create_engine / create_async_engine, from settings."""
+    options: dict = {"pool_pre_ping": settings.db_pool_pre_ping not in ("idle", "never")}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options  # in-memory SQLite keeps its single-connection pool
+    options.update(
+        poolclass=timed_pool_class(base, name, settings.db_max_overflow),
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
     )
+    return options
+
+
+def _install_pool_events(sync_engine: Engine) -> None:
+    install_pool_events(sync_engine)
+    # "always" is SQLAlchemy's own pool_pre_ping: a round trip on every checkout. "idle" skips
+    # it for connections that were just returned, which is nearly every checkout under load.
+    if settings.db_pool_pre_ping == "idle":
+        install_idle_pre_ping(sync_engine, settings.db_pool_pre_ping_idle_seconds)
+
+
+def _make_engine(url: str) -> Engine:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        connect_args = {"check_same_thread": False}
+    else:
+        # Postgres/other
+        connect_args = {"connect_timeout": 2}
+    sync_engine = create_engine(
+        parsed, connect_args=connect_args, **_pool_options(parsed, QueuePool, "sync")
+    )
+    _install_pool_events(sync_engine)
+    return sync_engine
 
 
 engine = _make_engine(requested_url)
@@ -53,6 +79,41 @@ if not requested_url.startswith("sqlite"):
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def _async_url(url: URL) -> URL:
+    # Same database as the sync engine (including the SQLite fallback), async driver.
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    # psycopg 3 serves both; create_async_engine picks its async dialect.
+    return url.set(drivername="postgresql+psycopg")
+
+
+def _make_async_engine(url: URL) -> AsyncEngine:
+    connect_args = {} if url.get_backend_name() == "sqlite" else {"connect_timeout": 2}
+    options = _pool_options(url, AsyncAdaptedQueuePool, "async")
+    async_engine = create_async_engine(url, connect_args=connect_args, **options)
+    _install_pool_events(async_engine.sync_engine)
+    return async_engine
+
+
+# Optional (ASYNC_DATABASE=true): an async engine for the hottest read routes, next to the sync
+# one every other route keeps using.
+async_engine = _make_async_engine(_async_url(engine.url)) if settings.async_database else None
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if async_engine is not None
+    else None
+)
+
+
+def pool_stats() -> dict:
+    """Occupancy and checkout timings of each engine's pool (this process)."""
+    return {
+        "pre_ping": settings.db_pool_pre_ping,
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine.sync_engine) if async_engine is not None else None,
+    }
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -60,3 +121,10 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async routes need ASYNC_DATABASE=true")
+    async with AsyncSessionLocal() as db:
+        yield db
+
@@ -1,6 +1,12 @@
 from __future__ import annotations
 
+import logging
+from typing import Optional
+
 from sqlalchemy import Engine, text
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
 
 
 def _column_names(engine: Engine, table: str) -> set[str]:
@@ -9,10 +15,13 @@ def _column_names(engine: Engine, table: str) -> set[str]:
     return {str(r[1]) for r in rows}  # name at index 1
 
 
-def ensure_sqlite_columns(engine: Engine) -> None:
+def ensure_sqlite_columns(engine: Engine, existing_tables: Optional[set[str]] = None) -> None:
     """
     SQLite doesn't auto-migrate when SQLAlchemy models change.
     Add any missing columns required for the MVP to keep dev DBs working.
+
+    `existing_tables` are the tables present before `create_all`; derived tables that were just
+    created for an existing database get backfilled from history.
     """
     if engine.dialect.name != "sqlite":
         return
@@ -20,9 +29,16 @@ def ensure_sqlite_columns(engine: Engine) -> None:
     # task_status grade columns
     try:
         status_cols = _column_names(engine, "task_status")
+        group_cols = _column_names(engine, "groups")
+        task_cols = _column_names(engine, "tasks")
+        event_cols = _column_names(engine, "events")
+        leaderboard_cols = _column_names(engine, "leaderboard_stats")
+        pet_cols = _column_names(engine, "pets")
     except Exception:
         return
 
+    added_counters = False
+
     with engine.begin() as conn:
         if "grade_letter" not in status_cols:
             conn.execute(text("ALTER TABLE task_status ADD COLUMN grade_letter VARCHAR(3)"))
@@ -35,3 +51,91 @@ def ensure_sqlite_columns(engine: Engine) -> None:
                     "ADD COLUMN health_delta INTEGER NOT NULL DEFAULT 0"
                 )
             )
+        if "state_version" not in group_cols:
+            conn.execute(
+                text("ALTER TABLE groups ADD COLUMN state_version INTEGER NOT NULL DEFAULT 1")
+            )
+        if "student_count" not in group_cols:
+            conn.execute(
+                text("ALTER TABLE groups ADD COLUMN student_count INTEGER NOT NULL DEFAULT 0")
+            )
+            added_counters = True
+        if "done_count" not in task_cols:
+            conn.execute(text("ALTER TABLE tasks ADD COLUMN done_count INTEGER NOT NULL DEFAULT 0"))
+            added_counters = True
+        if "version" not in pet_cols:
+            conn.execute(text("ALTER TABLE pets ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+        # Delta-sync version stamps; existing rows predate any version a client can hold.
+        for table, column, cols in (
+            ("tasks", "changed_version", task_cols),
+            ("events", "group_version", event_cols),
+            ("leaderboard_stats", "changed_version", leaderboard_cols),
+        ):
+            if column not in cols:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER"))
+                conn.execute(text(f"UPDATE {table} SET {column} = 0"))
+        # create_all only creates indexes for tables it creates.
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_events_group_id_created_at "
+                "ON events (group_id, created_at, id)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_events_group_id_group_version "
+                "ON events (group_id, group_version)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_tasks_group_id_changed_version "
+                "ON tasks (group_id, changed_version)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_tasks_pending_penalty_due_at "
+                "ON tasks (due_at) WHERE penalty_applied_at IS NULL"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_tasks_pending_penalty_group_id_due_at "
+                "ON tasks (group_id, due_at) WHERE penalty_applied_at IS NULL"
+            )
+        )
+
+    try:
+        with engine.begin() as conn:
+            # Penalty inserts rely on this (ON CONFLICT DO NOTHING); older dev DBs lack it.
+            conn.execute(
+                text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS uq_events_task_missed "
+                    "ON events (type, task_id, target_user_id) "
+                    "WHERE type = 'TASK_MISSED' AND task_id IS NOT NULL "
+                    "AND target_user_id IS NOT NULL"
+                )
+            )
+    except IntegrityError:
+        logger.warning("uq_events_task_missed not created: duplicate TASK_MISSED events exist")
+
+    if added_counters:
+        # Backfill the new denormalized counters from existing rows.
+        from sqlalchemy.orm import Session
+
+        from app.services.counters import reconcile_counters
+
+        with Session(engine) as db:
+            reconcile_counters(db, fix=True)
+            db.commit()
+
+    existing_tables = existing_tables or set()
+    if "events" in existing_tables and "leaderboard_stats" not in existing_tables:
+        from sqlalchemy.orm import Session
+
+        from app.services.leaderboard import rebuild_leaderboard
+
+        with Session(engine) as db:
+            rebuild_leaderboard(db)
+            db.commit()
@@ -7,11 +7,13 @@ from typing import Optional
 from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.models.user import User
-from app.utils.jwt import decode_access_token
+from app.services.auth_cache import get_auth_cache
+from app.utils.jwt import STREAM_TOKEN_SCOPE, decode_access_token
 
 # Make HTTPBearer optional so demo auth can still work
 security = HTTPBearer(auto_error=False)
@@ -24,6 +26,18 @@ class CurrentUser:
     display_name: str
 
 
+def _require_credentials(
+    credentials: Optional[HTTPAuthorizationCredentials],
+) -> HTTPAuthorizationCredentials:
+    if not credentials:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required. Please login or register.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return credentials
+
+
 def get_current_user(
     db: Session = Depends(get_db),  # noqa: B008 (FastAPI dependency injection)
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
@@ -33,23 +47,74 @@ def get_current_user(
     
     Users must register/login to get a JWT token.
     """
-    if not credentials:
+    return resolve_user_from_token(db, _require_credentials(credentials).credentials)
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),  # noqa: B008 (FastAPI dependency injection)
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+) -> CurrentUser:
+    """get_current_user for async routes (ASYNC_DATABASE=true); no threadpool thread is held."""
+    user_uuid = _user_id_from_token(_require_credentials(credentials).credentials)
+    cached = _cached_user(user_uuid)
+    if cached is not None:
+        return cached
+    return _remember_user(await db.scalar(select(User).where(User.id == user_uuid)))
+
+
+def resolve_user_from_token(db: Session, token: str) -> CurrentUser:
+    """Validate a bearer token and load its user (shared by header and query-string auth)."""
+    user_uuid = _user_id_from_token(token)
+    cached = _cached_user(user_uuid)
+    if cached is not None:
+        return cached
+    return _remember_user(db.scalar(select(User).where(User.id == user_uuid)))
+
+
+def resolve_user_from_stream_token(db: Session, token: str, group_id: str) -> CurrentUser:
+    """Validate a stream token (see create_stream_token) for `group_id` and load its user."""
+    payload = _verified_payload(token)
+    try:
+        same_group = uuid.UUID(str(payload.get("grp"))) == uuid.UUID(group_id)
+    except ValueError:
+        same_group = False
+    if payload.get("scope") != STREAM_TOKEN_SCOPE or not same_group:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Authentication required. Please login or register.",
+            detail="Invalid stream token.",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    user_uuid = _user_id_from_payload(payload)
+    cached = _cached_user(user_uuid)
+    if cached is not None:
+        return cached
+    return _remember_user(db.scalar(select(User).where(User.id == user_uuid)))
 
-    token = credentials.credentials
+
+def _verified_payload(token: str) -> dict:
     payload = decode_access_token(token)
-    
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token. Please login again.",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return payload
 
+
+def _user_id_from_token(token: str) -> uuid.UUID:
+    payload = _verified_payload(token)
+    if payload.get("scope") == STREAM_TOKEN_SCOPE:
+        # Stream tokens end up in URLs and logs; they must not work as login tokens.
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token. Please login again.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _user_id_from_payload(payload)
+
+
+def _user_id_from_payload(payload: dict) -> uuid.UUID:
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(
@@ -59,7 +124,7 @@ def get_current_user(
         )
 
     try:
-        user_uuid = uuid.UUID(user_id)
+        return uuid.UUID(user_id)
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,7 +132,13 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = db.scalar(select(User).where(User.id == user_uuid))
+
+def _cached_user(user_uuid: uuid.UUID) -> Optional[CurrentUser]:
+    cache = get_auth_cache()
+    return cache.users.get(user_uuid) if cache is not None else None
+
+
+def _remember_user(user: Optional[User]) -> CurrentUser:
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -75,5 +146,8 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return CurrentUser(id=user.id, email=user.email, display_name=user.display_name)
-
+    current = CurrentUser(id=user.id, email=user.email, display_name=user.display_name)
+    cache = get_auth_cache()
+    if cache is not None:
+        cache.users.set(user.id, current)
+    return current
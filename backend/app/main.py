@@ -4,11 +4,17 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 import traceback
 
+from sqlalchemy import inspect
+
 from app.api.router import api_router
 from app.core.config import get_settings
 from app.db.base import Base
 from app.db.session import engine
 from app.db.sqlite_schema import ensure_sqlite_columns
+from app.services.live_updates import get_live_update_hub
+from app.services.penalty_queue import get_penalty_queue
+from app.utils.jwks import get_jwks_cache
+from app.utils.password import get_password_hasher
 
 settings = get_settings()
 
@@ -54,8 +60,9 @@ app.add_middleware(
 def _ensure_sqlite_schema() -> None:
     # If we fell back to SQLite, create tables automatically for MVP dev.
     if engine.url.get_backend_name() == "sqlite":
+        existing_tables = set(inspect(engine).get_table_names())
         Base.metadata.create_all(bind=engine)
-        ensure_sqlite_columns(engine)
+        ensure_sqlite_columns(engine, existing_tables=existing_tables)
     else:
         # For PostgreSQL, try to run migrations automatically on startup
         # This helps when Shell access is not available (e.g., free tier)
@@ -69,5 +76,42 @@ def _ensure_sqlite_schema() -> None:
             # If migrations fail, continue anyway - tables might already exist
             pass
 
-app.include_router(api_router)
 
+@app.on_event("startup")
+def _calibrate_password_hashing() -> None:
+    # Measures bcrypt on this CPU now rather than during the first login.
+    get_password_hasher()
+
+
+@app.on_event("startup")
+def _load_jwks() -> None:
+    # Fetch the issuer's keys up front so no request waits on the first fetch.
+    jwks = get_jwks_cache()
+    if jwks is not None:
+        jwks.refresh()
+
+
+@app.on_event("startup")
+def _start_live_updates() -> None:
+    get_live_update_hub().start()
+
+
+@app.on_event("shutdown")
+def _stop_live_updates() -> None:
+    get_live_update_hub().close()
+
+
+@app.on_event("startup")
+def _start_penalty_queue() -> None:
+    penalty_queue = get_penalty_queue()
+    if penalty_queue is not None:
+        penalty_queue.start()
+
+
+@app.on_event("shutdown")
+def _stop_penalty_queue() -> None:
+    penalty_queue = get_penalty_queue()
+    if penalty_queue is not None:
+        penalty_queue.close()
+
+app.include_router(api_router)
@@ -14,8 +14,11 @@ from app.models.enums import (  # noqa: F401
 from app.models.event import Event  # noqa: F401
 from app.models.group import Group  # noqa: F401
 from app.models.group_membership import GroupMembership  # noqa: F401
+from app.models.leaderboard_stat import LeaderboardStat  # noqa: F401
 from app.models.pet import Pet  # noqa: F401
 from app.models.task import Task  # noqa: F401
+from app.models.task_lease import TaskLease  # noqa: F401
 from app.models.task_status import TaskStatus  # noqa: F401
+from app.models.task_tombstone import TaskTombstone  # noqa: F401
 from app.models.user import User  # noqa: F401
 
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import uuid
+from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import DateTime, Enum, ForeignKey, Integer, String, func
+from sqlalchemy import DateTime, Enum, ForeignKey, Index, Integer, String, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -11,8 +12,30 @@ from app.db.base import Base
 from app.models.enums import EventType
 
 
+def _now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# At most one TASK_MISSED per (task, student); penalty inserts rely on it via ON CONFLICT.
+_MISSED_PREDICATE = "type = 'TASK_MISSED' AND task_id IS NOT NULL AND target_user_id IS NOT NULL"
+
+
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Keyset pagination of a group's feed: (created_at DESC, id DESC) within group_id.
+        Index("ix_events_group_id_created_at", "group_id", "created_at", "id"),
+        Index("ix_events_group_id_group_version", "group_id", "group_version"),
+        Index(
+            "uq_events_task_missed",
+            "type",
+            "task_id",
+            "target_user_id",
+            unique=True,
+            postgresql_where=text(_MISSED_PREDICATE),
+            sqlite_where=text(_MISSED_PREDICATE),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
@@ -38,9 +61,14 @@ class Event(Base):
 
     delta: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     message: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    # Group state version that introduced this event (stamped by bump_group_version).
+    group_version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
+    # Stamped in Python with microseconds: the server's now() is per second on SQLite and per
+    # transaction on Postgres, which would leave events written together in random feed order.
     created_at: Mapped[DateTime] = mapped_column(
         DateTime(timezone=True),
+        default=_now_utc,
         server_default=func.now(),
         nullable=False,
         index=True,
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import uuid
+from typing import Optional
+
+from sqlalchemy import ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class LeaderboardStat(Base):
+    """Per-(group, user) FRIEND-mode leaderboard aggregates, maintained on write."""
+
+    __tablename__ = "leaderboard_stats"
+
+    group_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("groups.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    # DONE task_status rows on this group's tasks
+    done_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # TASK_MISSED events targeting this user in this group
+    missed_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Group state version of the last change (stamped by bump_group_version).
+    changed_version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
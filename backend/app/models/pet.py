@@ -23,6 +23,9 @@ class Pet(Base):
     health: Mapped[int] = mapped_column(Integer, nullable=False, default=100)
     max_health: Mapped[int] = mapped_column(Integer, nullable=False, default=100)
     avatar_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    # Incremented by every health write (see app.services.pet_health); compare-and-swap
+    # writers use it to detect concurrent changes.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     updated_at: Mapped[DateTime] = mapped_column(
         DateTime(timezone=True),
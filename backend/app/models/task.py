@@ -3,16 +3,37 @@ from __future__ import annotations
 import uuid
 from typing import Optional
 
-from sqlalchemy import DateTime, Enum, ForeignKey, Integer, String, func
+from sqlalchemy import DateTime, Enum, ForeignKey, Index, Integer, String, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
 from app.models.enums import TaskType
 
+# Predicate of the partial pending-penalty indexes; queries must include it verbatim.
+PENDING_PENALTY_PREDICATE = "penalty_applied_at IS NULL"
+
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_group_id_changed_version", "group_id", "changed_version"),
+        # Pending-penalty discovery only ever looks at tasks without penalty_applied_at, so
+        # these stay as small as the set of not-yet-penalized tasks, not the term's history.
+        Index(
+            "ix_tasks_pending_penalty_due_at",
+            "due_at",
+            postgresql_where=text(PENDING_PENALTY_PREDICATE),
+            sqlite_where=text(PENDING_PENALTY_PREDICATE),
+        ),
+        Index(
+            "ix_tasks_pending_penalty_group_id_due_at",
+            "group_id",
+            "due_at",
+            postgresql_where=text(PENDING_PENALTY_PREDICATE),
+            sqlite_where=text(PENDING_PENALTY_PREDICATE),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
@@ -25,6 +46,14 @@ class Task(Base):
 
     due_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
     penalty: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    # Denormalized number of students with DONE/EXCUSED status (see app.services.counters).
+    done_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+
+    # Group state version of the last change to anything shown for this task; NULL until
+    # bump_group_version stamps it (see app.services.group_versions).
+    changed_version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     created_by_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("users.id", ondelete="RESTRICT"), nullable=False, index=True
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import uuid
+from typing import Optional
+
+from sqlalchemy import ForeignKey, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class TaskTombstone(Base):
+    """Records deleted tasks so delta sync (`?since=`) can tell clients to drop them."""
+
+    __tablename__ = "task_tombstones"
+    __table_args__ = (Index("ix_task_tombstones_group_id_version", "group_id", "version"),)
+
+    # No FK: the task row is gone by definition.
+    task_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    group_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("groups.id", ondelete="CASCADE"), nullable=False
+    )
+    # Group state version of the deletion (stamped by bump_group_version).
+    version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
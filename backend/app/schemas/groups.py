@@ -24,6 +24,7 @@ class GroupSummary(ApiModel):
     pet_health: Optional[int] = None
     pet_max_health: Optional[int] = None
     is_creator: bool = False
+    penalties_pending: bool = False
 
 
 class CreateGroupRequest(ApiModel):
@@ -50,3 +51,7 @@ class JoinGroupResponse(ApiModel):
 class MyGroupsResponse(ApiModel):
     groups: list[GroupSummary]
 
+
+class StreamTokenResponse(ApiModel):
+    stream_token: str
+    expires_in: int
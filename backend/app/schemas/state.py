@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import Field
 
@@ -68,10 +68,41 @@ class EventOut(ApiModel):
     target: Optional[UserRef] = None
 
 
+class EventPage(ApiModel):
+    events: list[EventOut]
+    # Pass as `before` to fetch the next (older) page; None when there is no more history.
+    next_cursor: Optional[str] = None
+
+
 class GroupStateResponse(ApiModel):
+    sync: Literal["full"] = "full"
+    # Group state version this snapshot reflects; send it back as `?since=` to get deltas.
+    version: int
     group: GroupHeader
     pet: PetState
     tasks: list[TaskState]
     leaderboard: Optional[list[LeaderboardEntry]] = None
     recent_events: list[EventOut]
+    # Cursor for GET /groups/{id}/events to continue past the embedded head of the feed.
+    recent_events_cursor: Optional[str] = None
+    # Overdue tasks are waiting for a background penalty pass (PENALTIES_ON_READ=background).
+    penalties_pending: bool = False
+
+
+
+class GroupStateDelta(ApiModel):
+    """Changes since `since`; merge into the snapshot at that version to get `version`."""
 
+    sync: Literal["delta"] = "delta"
+    version: int
+    since: int
+    group: GroupHeader
+    pet: PetState
+    # Tasks added or changed (including the viewer's own status); replace by id.
+    tasks: list[TaskState]
+    removed_task_ids: list[str]
+    # FRIEND mode: changed rows only; replace by user id and re-sort.
+    leaderboard: Optional[list[LeaderboardEntry]] = None
+    # Newest first; prepend to recent_events.
+    new_events: list[EventOut]
+    penalties_pending: bool = False
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import uuid
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.enums import GroupRole
+from app.utils.ttl_cache import TTLCache
+
+if TYPE_CHECKING:
+    from app.deps.auth import CurrentUser
+
+_PENDING_KEY = "pending_auth_invalidations"
+
+
+class AuthCache:
+    """
+    Per-process cache of authenticated users and group membership roles.
+
+    Only positive lookups are cached. Groups themselves are not: their state_version drives
+    ETags and deltas, so callers still load the group row. Local membership writes drop entries
+    once they commit (see forget_membership / forget_group). Nothing changes a user's cached
+    fields after registration, so user entries only leave by TTL, which also bounds how long
+    another process's changes can go unnoticed.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.users: TTLCache[uuid.UUID, CurrentUser] = TTLCache(max_entries, ttl_seconds)
+        self.memberships: TTLCache[tuple[uuid.UUID, uuid.UUID], GroupRole] = TTLCache(
+            max_entries, ttl_seconds
+        )
+
+    def invalidate_membership(self, group_id: uuid.UUID, user_id: uuid.UUID) -> None:
+        self.memberships.pop((group_id, user_id))
+
+    def invalidate_group(self, group_id: uuid.UUID) -> None:
+        self.memberships.pop_where(lambda key: key[0] == group_id)
+
+    def stats(self) -> dict:
+        return {"users": self.users.stats(), "memberships": self.memberships.stats()}
+
+
+@lru_cache
+def get_auth_cache() -> Optional[AuthCache]:
+    """The shared cache, or None when AUTH_CACHE_ENABLED is off (every request hits the DB)."""
+    settings = get_settings()
+    if not settings.auth_cache_enabled:
+        return None
+    return AuthCache(
+        max_entries=settings.auth_cache_max_entries,
+        ttl_seconds=settings.auth_cache_ttl_seconds,
+    )
+
+
+def _forget(db: Session, kind: str, *key: uuid.UUID) -> None:
+    # Applied after commit: dropping earlier would let a concurrent request re-cache the old row.
+    db.info.setdefault(_PENDING_KEY, set()).add((kind, key))
+
+
+def forget_membership(db: Session, group_id: uuid.UUID, user_id: uuid.UUID) -> None:
+    """Drop a cached membership once the caller's transaction commits (join, role change)."""
+    _forget(db, "membership", group_id, user_id)
+
+
+def forget_group(db: Session, group_id: uuid.UUID) -> None:
+    """Drop every cached membership of a group once the transaction commits (group deleted)."""
+    _forget(db, "group", group_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_invalidations(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    cache = get_auth_cache()
+    if not pending or cache is None:
+        return
+    for kind, key in pending:
+        if kind == "membership":
+            cache.invalidate_membership(*key)
+        else:
+            cache.invalidate_group(*key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -2,15 +2,19 @@ from __future__ import annotations
 
 import uuid
 from dataclasses import dataclass
+from typing import Optional
 
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.deps.auth import CurrentUser
 from app.models.enums import GroupMode, GroupRole
 from app.models.group import Group
 from app.models.group_membership import GroupMembership
+from app.models.task import Task
+from app.services.auth_cache import get_auth_cache
 
 
 @dataclass(frozen=True)
@@ -19,34 +23,124 @@ class MembershipContext:
     membership: GroupMembership
 
 
-def require_group_membership(db: Session, group_id: str, user: CurrentUser) -> MembershipContext:
+@dataclass(frozen=True)
+class TaskContext(MembershipContext):
+    task: Task
+
+
+def _parse_uuid(value: str, detail: str) -> uuid.UUID:
     try:
-        group_uuid = uuid.UUID(group_id)
+        return uuid.UUID(value)
     except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid group id",
-        ) from e
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail) from e
 
-    group = db.scalar(select(Group).where(Group.id == group_uuid))
-    if group is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
 
-    membership = db.scalar(
-        select(GroupMembership).where(
-            GroupMembership.group_id == group_uuid,
-            GroupMembership.user_id == user.id,
-        )
-    )
+def _caller_membership(user: CurrentUser):
+    # Outer join, so a missing membership (403) is told apart from a missing group (404).
+    return and_(GroupMembership.group_id == Group.id, GroupMembership.user_id == user.id)
+
+
+def _require_member(membership: Optional[GroupMembership]) -> GroupMembership:
     if membership is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of this group",
         )
+    return membership
+
 
+def require_group_membership(db: Session, group_id: str, user: CurrentUser) -> MembershipContext:
+    """Load the group and the caller's membership in one query (404 / 403 when missing)."""
+    group_uuid = _parse_uuid(group_id, "Invalid group id")
+    role = _cached_role(group_uuid, user)
+    if role is not None:
+        # The group row is always read fresh (its state_version drives ETags and deltas).
+        ctx = _cached_context(db.get(Group, group_uuid), group_uuid, user, role)
+        if ctx is not None:
+            return ctx
+
+    row = db.execute(_group_membership_query(group_uuid, user)).first()
+    return _membership_context(row)
+
+
+async def require_group_membership_async(
+    db: AsyncSession, group_id: str, user: CurrentUser
+) -> MembershipContext:
+    """require_group_membership for async routes."""
+    group_uuid = _parse_uuid(group_id, "Invalid group id")
+    role = _cached_role(group_uuid, user)
+    if role is not None:
+        ctx = _cached_context(await db.get(Group, group_uuid), group_uuid, user, role)
+        if ctx is not None:
+            return ctx
+
+    row = (await db.execute(_group_membership_query(group_uuid, user))).first()
+    return _membership_context(row)
+
+
+def _cached_role(group_uuid: uuid.UUID, user: CurrentUser) -> Optional[GroupRole]:
+    cache = get_auth_cache()
+    return cache.memberships.get((group_uuid, user.id)) if cache is not None else None
+
+
+def _cached_context(
+    group: Optional[Group], group_uuid: uuid.UUID, user: CurrentUser, role: GroupRole
+) -> Optional[MembershipContext]:
+    if group is None:
+        cache = get_auth_cache()
+        if cache is not None:
+            cache.invalidate_group(group_uuid)
+        return None
+    membership = GroupMembership(group_id=group_uuid, user_id=user.id, role=role)
     return MembershipContext(group=group, membership=membership)
 
 
+def _group_membership_query(group_uuid: uuid.UUID, user: CurrentUser):
+    return (
+        select(Group, GroupMembership)
+        .outerjoin(GroupMembership, _caller_membership(user))
+        .where(Group.id == group_uuid)
+    )
+
+
+def _membership_context(row) -> MembershipContext:
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
+    group, membership = row
+    ctx = MembershipContext(group=group, membership=_require_member(membership))
+    _remember(ctx)
+    return ctx
+
+
+def _remember(ctx: MembershipContext) -> None:
+    cache = get_auth_cache()
+    if cache is not None:
+        key = (ctx.membership.group_id, ctx.membership.user_id)
+        cache.memberships.set(key, ctx.membership.role)
+
+
+def require_task_membership(db: Session, task_id: str, user: CurrentUser) -> TaskContext:
+    """
+    Load a task, its group and the caller's membership in one joined query.
+
+    The rows land in the session's identity map, so later `db.get(Group, ...)` calls in the
+    same request are free.
+    """
+    task_uuid = _parse_uuid(task_id, "Invalid task id")
+    row = db.execute(
+        select(Task, Group, GroupMembership)
+        .join(Group, Group.id == Task.group_id)
+        .outerjoin(GroupMembership, _caller_membership(user))
+        .where(Task.id == task_uuid)
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    task, group, membership = row
+    ctx = TaskContext(group=group, membership=_require_member(membership), task=task)
+    _remember(ctx)
+    return ctx
+
+
 def require_instructor_or_creator(ctx: MembershipContext, user: CurrentUser) -> None:
     if ctx.group.created_by_id == user.id:
         return
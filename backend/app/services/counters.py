@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.enums import GroupRole, TaskStatusValue
+from app.models.group import Group
+from app.models.group_membership import GroupMembership
+from app.models.task import Task
+from app.models.task_status import TaskStatus
+from app.services.group_versions import bump_group_version, mark_group_tasks_changed
+
+# Statuses that count toward a task's done_count.
+COUNTED_STATUSES = (TaskStatusValue.DONE, TaskStatusValue.EXCUSED)
+
+
+def counts_as_done(status: Optional[TaskStatusValue]) -> bool:
+    return status in COUNTED_STATUSES
+
+
+def adjust_task_done_count(db: Session, task_id: uuid.UUID, delta: int) -> None:
+    """Apply a done_count change in the caller's transaction (atomic, no read-modify-write)."""
+    if delta == 0:
+        return
+    db.execute(
+        update(Task)
+        .where(Task.id == task_id)
+        .values(done_count=Task.done_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def adjust_group_student_count(db: Session, group_id: uuid.UUID, delta: int) -> None:
+    if delta == 0:
+        return
+    db.execute(
+        update(Group)
+        .where(Group.id == group_id)
+        .values(student_count=Group.student_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# --- Reconciliation --------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class CounterDrift:
+    kind: str  # "task.done_count" | "group.student_count"
+    id: uuid.UUID
+    stored: int
+    actual: int
+
+
+@dataclass
+class ReconcileReport:
+    tasks_checked: int = 0
+    groups_checked: int = 0
+    drift: list[CounterDrift] = field(default_factory=list)
+
+
+def _actual_done_count():
+    return (
+        select(func.count())
+        .select_from(TaskStatus)
+        .join(
+            GroupMembership,
+            (GroupMembership.user_id == TaskStatus.user_id)
+            & (GroupMembership.group_id == Task.group_id),
+        )
+        .where(
+            TaskStatus.task_id == Task.id,
+            TaskStatus.status.in_(COUNTED_STATUSES),
+            GroupMembership.role == GroupRole.STUDENT,
+        )
+        .correlate(Task)
+        .scalar_subquery()
+    )
+
+
+def _actual_student_count():
+    return (
+        select(func.count())
+        .select_from(GroupMembership)
+        .where(
+            GroupMembership.group_id == Group.id,
+            GroupMembership.role == GroupRole.STUDENT,
+        )
+        .correlate(Group)
+        .scalar_subquery()
+    )
+
+
+def reconcile_counters(db: Session, *, fix: bool = True) -> ReconcileReport:
+    """
+    Recompute every denormalized counter from the source tables in bulk and report drift.
+
+    With fix=True, drifted rows are corrected in the caller's transaction (caller commits) and
+    the affected groups' versions are bumped so clients pick the corrections up.
+    """
+    report = ReconcileReport()
+
+    actual_done = _actual_done_count()
+    for task_id, stored, actual in db.execute(select(Task.id, Task.done_count, actual_done)):
+        report.tasks_checked += 1
+        if int(stored) != int(actual):
+            report.drift.append(CounterDrift("task.done_count", task_id, int(stored), int(actual)))
+
+    actual_students = _actual_student_count()
+    for group_id, stored, actual in db.execute(
+        select(Group.id, Group.student_count, actual_students)
+    ):
+        report.groups_checked += 1
+        if int(stored) != int(actual):
+            report.drift.append(
+                CounterDrift("group.student_count", group_id, int(stored), int(actual))
+            )
+
+    if fix and report.drift:
+        drifted_tasks = [d.id for d in report.drift if d.kind == "task.done_count"]
+        drifted_groups = [d.id for d in report.drift if d.kind == "group.student_count"]
+        affected_groups = set(drifted_groups)
+        if drifted_tasks:
+            db.execute(
+                update(Task)
+                .where(Task.id.in_(drifted_tasks))
+                .values(done_count=_actual_done_count(), changed_version=None)
+                .execution_options(synchronize_session=False)
+            )
+            affected_groups.update(
+                db.scalars(select(Task.group_id).where(Task.id.in_(drifted_tasks)).distinct())
+            )
+        if drifted_groups:
+            db.execute(
+                update(Group)
+                .where(Group.id.in_(drifted_groups))
+                .values(student_count=_actual_student_count())
+                .execution_options(synchronize_session=False)
+            )
+            for group_id in drifted_groups:
+                mark_group_tasks_changed(db, group_id)
+        for group_id in affected_groups:
+            bump_group_version(db, group_id)
+
+    return report
@@ -1,18 +1,30 @@
 from __future__ import annotations
 
 import uuid
-from datetime import datetime, timezone
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
-from sqlalchemy import func, select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import Select, and_, cast, delete, exists, func, literal, select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
 
-from app.models.enums import EventType, GroupRole, TaskStatusValue
+from app.db.dialects import dialect_name, insert_for
+from app.models.enums import EventType, GroupRole
 from app.models.event import Event
 from app.models.group_membership import GroupMembership
 from app.models.pet import Pet
 from app.models.task import Task
+from app.models.task_lease import TaskLease
 from app.models.task_status import TaskStatus
+from app.services.counters import COUNTED_STATUSES
+from app.services.group_versions import bump_group_version
+from app.services.leaderboard import record_missed_bulk
+from app.services.pet_health import adjust_pets_health
+from app.utils.single_flight import SingleFlight
+
+# Concurrent dashboard loads of one group share a single penalty pass.
+_penalty_flight: SingleFlight[int] = SingleFlight("deadline_penalties")
 
 
 def _now_utc() -> datetime:
@@ -27,103 +39,248 @@ def _to_uuid(val: object) -> uuid.UUID:
     raise TypeError("Expected UUID or str")
 
 
-def apply_deadline_penalties_for_group(db: Session, group_id) -> int:
+# --- Set-based engine ------------------------------------------------------------------------
+# A batch of overdue tasks costs a constant number of statements however many students miss
+# them: one INSERT ... SELECT of the TASK_MISSED events (duplicates dropped by the
+# uq_events_task_missed index via ON CONFLICT DO NOTHING, the inserted rows coming back via
+# RETURNING), one UPDATE of the affected pets, one leaderboard upsert, one UPDATE marking the
+# tasks, plus the per-group version bumps.
+
+
+def _new_uuid(dialect: str) -> ColumnElement:
+    if dialect == "postgresql":
+        return func.gen_random_uuid()
+    # SQLite stores UUIDs as 32-char hex.
+    return func.lower(func.hex(func.randomblob(16)))
+
+
+def overdue_criteria(now: datetime) -> tuple[ColumnElement[bool], ...]:
     """
-    Apply missed-deadline penalties for one group.
-    NOTE: This mutates state during a GET (dashboard) for demo convenience.
+    Filter for tasks past due without penalties yet.
+
+    It includes the predicate of the partial ix_tasks_pending_penalty_* indexes, so lookups
+    scale with the pending set rather than the whole task history.
     """
-    now = _now_utc()
-    applied_events = 0
-    group_uuid = _to_uuid(group_id)
+    return (Task.penalty_applied_at.is_(None), Task.due_at < now)
+
+
+def overdue_task_ids(
+    db: Session, *criteria, now: datetime, limit: Optional[int] = None
+) -> list[uuid.UUID]:
+    """Ids of tasks past due without penalties yet (optionally narrowed by `criteria`)."""
+    q = (
+        select(Task.id)
+        .where(*criteria, *overdue_criteria(now))
+        .order_by(Task.due_at.asc())
+        .limit(limit)
+    )
+    if dialect_name(db) != "sqlite":
+        # Concurrent passes (other viewers, the worker) skip tasks already being handled.
+        q = q.with_for_update(skip_locked=True)
+    return list(db.scalars(q))
 
-    overdue_tasks = (
+
+def _insert_missed_events(
+    db: Session, task_ids: Sequence[uuid.UUID]
+) -> list[tuple[uuid.UUID, uuid.UUID, int]]:
+    """Record a miss for every student without a DONE/EXCUSED status; returns new rows."""
+    dialect = dialect_name(db)
+    missed = (
+        select(
+            _new_uuid(dialect),
+            Task.group_id,
+            # Explicit cast: an untyped parameter would reach Postgres as text, not eventtype.
+            cast(literal(EventType.TASK_MISSED), Event.__table__.c.type.type),
+            GroupMembership.user_id,
+            Task.id,
+            -Task.penalty,
+        )
+        .join(
+            GroupMembership,
+            and_(
+                GroupMembership.group_id == Task.group_id,
+                GroupMembership.role == GroupRole.STUDENT,
+            ),
+        )
+        .outerjoin(
+            TaskStatus,
+            and_(
+                TaskStatus.task_id == Task.id,
+                TaskStatus.user_id == GroupMembership.user_id,
+                TaskStatus.status.in_(COUNTED_STATUSES),
+            ),
+        )
+        .where(Task.id.in_(task_ids), TaskStatus.task_id.is_(None))
+    )
+    stmt = (
+        insert_for(db)(Event)
+        .from_select(["id", "group_id", "type", "target_user_id", "task_id", "delta"], missed)
+        .on_conflict_do_nothing()
+        .returning(Event.group_id, Event.target_user_id, Event.delta)
+    )
+    return [tuple(row) for row in db.execute(stmt)]
+
+
+def _apply_pet_deltas(db: Session, deltas: dict[uuid.UUID, int]) -> None:
+    """Add a (negative) health delta per group in one UPDATE, creating missing pets."""
+    updated = adjust_pets_health(db, deltas)
+    missing = {group_id: delta for group_id, delta in deltas.items() if group_id not in updated}
+    if missing:
         db.execute(
-            select(Task)
-            .where(
-                Task.group_id == group_uuid,
-                Task.due_at < now,
-                Task.penalty_applied_at.is_(None),
+            insert_for(db)(Pet)
+            .values(
+                [
+                    {"group_id": group_id, "name": "Pibble", "health": 100, "max_health": 100}
+                    for group_id in sorted(missing)
+                ]
             )
-            .order_by(Task.due_at.asc())
+            .on_conflict_do_nothing()
         )
-        .scalars()
-        .all()
+        adjust_pets_health(db, missing)
+
+
+def apply_penalties_to_tasks(
+    db: Session, task_ids: Sequence[uuid.UUID], now: datetime
+) -> dict[uuid.UUID, int]:
+    """
+    Apply missed-deadline penalties for the given overdue tasks, inside the caller's
+    transaction (the caller commits).
+
+    Returns penalties applied per group (groups with none are omitted). The tasks are marked
+    penalized either way so fully completed tasks aren't rescanned.
+    """
+    if not task_ids:
+        return {}
+
+    inserted = _insert_missed_events(db, task_ids)
+    applied: dict[uuid.UUID, int] = {}
+    deltas: dict[uuid.UUID, int] = {}
+    for group_id, _, delta in inserted:
+        applied[group_id] = applied.get(group_id, 0) + 1
+        deltas[group_id] = deltas.get(group_id, 0) + int(delta)
+
+    if deltas:
+        _apply_pet_deltas(db, deltas)
+        record_missed_bulk(db, ((group_id, user_id) for group_id, user_id, _ in inserted))
+
+    db.execute(
+        update(Task)
+        .where(Task.id.in_(task_ids))
+        .values(penalty_applied_at=now)
+        .execution_options(synchronize_session=False)
     )
-    if not overdue_tasks:
+    for group_id in sorted(applied):
+        bump_group_version(db, group_id)
+    return applied
+
+
+# --- Claiming (deadline workers) -------------------------------------------------------------
+# Workers claim batches of overdue tasks so any number of them (threads, processes, hosts) can
+# drain a backlog in parallel without duplicating work. On Postgres the claim is the row lock
+# taken by FOR UPDATE SKIP LOCKED, held until the batch commits. SQLite has no row locks, so
+# claims are rows in task_leases, committed up front and deleted with the batch.
+
+
+def claim_overdue_tasks(
+    db: Session, *, now: datetime, limit: int, worker_id: str, lease_seconds: float
+) -> list[uuid.UUID]:
+    """Claim up to `limit` overdue tasks for this worker; process them in the same session."""
+    if dialect_name(db) != "sqlite":
+        return overdue_task_ids(db, now=now, limit=limit)
+
+    wall_clock = _now_utc()
+    db.execute(delete(TaskLease).where(TaskLease.expires_at < wall_clock))
+    unclaimed = (
+        select(
+            Task.id,
+            literal(worker_id, TaskLease.worker_id.type),
+            literal(wall_clock + timedelta(seconds=lease_seconds), TaskLease.expires_at.type),
+        )
+        .where(*overdue_criteria(now), ~exists().where(TaskLease.task_id == Task.id))
+        .order_by(Task.due_at.asc())
+        .limit(limit)
+    )
+    task_ids = list(
+        db.scalars(
+            insert_for(db)(TaskLease)
+            .from_select(["task_id", "worker_id", "expires_at"], unclaimed)
+            .returning(TaskLease.task_id)
+        )
+    )
+    # Publish the claims before the (longer) penalty transaction.
+    db.commit()
+    return task_ids
+
+
+def release_task_claims(db: Session, task_ids: Sequence[uuid.UUID]) -> None:
+    """Drop lease rows for a processed batch, inside its transaction (no-op on Postgres)."""
+    if task_ids and dialect_name(db) == "sqlite":
+        db.execute(delete(TaskLease).where(TaskLease.task_id.in_(task_ids)))
+
+
+# --- Entry points ----------------------------------------------------------------------------
+
+
+def apply_deadline_penalties_for_group(db: Session, group_id) -> int:
+    """
+    Apply missed-deadline penalties for one group.
+    NOTE: This mutates state during a GET (dashboard) for demo convenience.
+    """
+    now = _now_utc()
+    task_ids = overdue_task_ids(db, Task.group_id == _to_uuid(group_id), now=now)
+    if not task_ids:
         return 0
+    applied = apply_penalties_to_tasks(db, task_ids, now)
+    db.commit()
+    return sum(applied.values())
 
-    is_sqlite = db.bind is not None and db.bind.dialect.name == "sqlite"
-
-    for task in overdue_tasks:
-        with db.begin_nested():
-            pet_q = select(Pet).where(Pet.group_id == group_uuid)
-            if not is_sqlite:
-                pet_q = pet_q.with_for_update()
-            pet = db.scalar(pet_q)
-            if pet is None:
-                pet = Pet(group_id=group_uuid, name="Pibble", health=100, max_health=100)
-                db.add(pet)
-                db.flush()
-
-            members = (
-                db.execute(
-                    select(GroupMembership.user_id)
-                    .where(
-                        GroupMembership.group_id == group_uuid,
-                        GroupMembership.role == GroupRole.STUDENT,
-                    )
-                    .order_by(GroupMembership.joined_at.asc())
-                )
-                .scalars()
-                .all()
-            )
 
-            for user_id in members:
-                user_uuid = _to_uuid(user_id)
-                status = db.scalar(
-                    select(TaskStatus.status).where(
-                        TaskStatus.task_id == task.id,
-                        TaskStatus.user_id == user_uuid,
-                    )
-                )
-                if status in (TaskStatusValue.DONE, TaskStatusValue.EXCUSED):
-                    continue
-
-                exists = db.scalar(
-                    select(func.count())
-                    .select_from(Event)
-                    .where(
-                        Event.group_id == group_uuid,
-                        Event.type == EventType.TASK_MISSED,
-                        Event.task_id == task.id,
-                        Event.target_user_id == user_uuid,
-                    )
-                )
-                if int(exists or 0) > 0:
-                    continue
-
-                try:
-                    with db.begin_nested():
-                        db.add(
-                            Event(
-                                group_id=group_uuid,
-                                type=EventType.TASK_MISSED,
-                                actor_user_id=None,
-                                target_user_id=user_uuid,
-                                task_id=task.id,
-                                delta=-int(task.penalty),
-                            )
-                        )
-                        db.flush()
-                except IntegrityError:
-                    continue
-
-                applied_events += 1
-                pet.health = max(0, min(pet.max_health, pet.health - int(task.penalty)))
-
-            task.penalty_applied_at = now
-
-    if applied_events:
-        db.commit()
-
-    return applied_events
+def pending_penalty_groups(db: Session, group_ids: Select | Iterable[uuid.UUID]) -> set[uuid.UUID]:
+    """Which of the groups have overdue tasks still waiting for penalties (read-only)."""
+    if not isinstance(group_ids, Select):
+        group_ids = list(group_ids)
+        if not group_ids:
+            return set()
+    q = (
+        select(Task.group_id)
+        .where(Task.group_id.in_(group_ids), *overdue_criteria(_now_utc()))
+        .distinct()
+    )
+    return set(db.scalars(q))
+
+
+def apply_deadline_penalties_coalesced(db: Session, group_id: uuid.UUID) -> int:
+    """
+    apply_deadline_penalties_for_group, shared with concurrent callers for the same group.
+
+    Returns the number of penalties applied by whichever call ran. When it is non-zero, the
+    caller's loaded Group is stale (the run may have committed in another session).
+    """
+    applied, _ = _penalty_flight.do(
+        group_id, lambda: apply_deadline_penalties_for_group(db, group_id=group_id)
+    )
+    return applied
+
+
+def apply_deadline_penalties_for_groups(
+    db: Session, group_ids: Select | Iterable[uuid.UUID]
+) -> dict[uuid.UUID, int]:
+    """
+    Apply missed-deadline penalties across many groups in one pass (e.g. for /groups/my).
+
+    `group_ids` may be a subquery selecting group ids. All overdue tasks go through one
+    set-based batch and are committed at once. Returns penalties applied per group (groups
+    with none are omitted).
+    """
+    if not isinstance(group_ids, Select):
+        group_ids = list(group_ids)
+        if not group_ids:
+            return {}
+
+    now = _now_utc()
+    task_ids = overdue_task_ids(db, Task.group_id.in_(group_ids), now=now)
+    if not task_ids:
+        return {}
+    applied = apply_penalties_to_tasks(db, task_ids, now)
+    db.commit()
+    return applied
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from sqlalchemy import Engine, func, select
+from sqlalchemy.orm import Session
+
+from app.db.dialects import dialect_name
+from app.models.task import Task
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel carrying the (ISO) due_at of tasks created or rescheduled.
+DEADLINE_CHANNEL = "task_deadlines"
+
+# Wake slightly after a deadline so `due_at < now` holds when the batch is claimed.
+_FIRE_SLACK = timedelta(milliseconds=20)
+
+
+def _now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything is stored in UTC.
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def notify_deadline(db: Session, due_at: datetime) -> None:
+    """
+    Tell running schedulers about a new or moved deadline (delivered when the caller commits).
+
+    Postgres only; schedulers on other databases notice by polling.
+    """
+    if dialect_name(db) == "postgresql":
+        db.execute(select(func.pg_notify(DEADLINE_CHANNEL, _aware(due_at).isoformat())))
+
+
+def _pending_deadlines(db: Session, limit: int) -> list[datetime]:
+    # Walks ix_tasks_pending_penalty_due_at (partial on the same predicate).
+    q = (
+        select(Task.due_at)
+        .where(Task.penalty_applied_at.is_(None))
+        .order_by(Task.due_at.asc())
+        .limit(limit)
+    )
+    return [_aware(due_at) for due_at in db.scalars(q)]
+
+
+class _PgDeadlineListener:
+    """A dedicated autocommit connection LISTENing on DEADLINE_CHANNEL."""
+
+    def __init__(self, engine: Engine) -> None:
+        raw = engine.raw_connection()
+        raw.detach()  # never handed back to the pool
+        self._raw = raw
+        self._conn: Any = raw.driver_connection
+        self._conn.autocommit = True
+        self._conn.execute(f"LISTEN {DEADLINE_CHANNEL}")
+
+    def wait(self, timeout: float) -> list[datetime]:
+        """Block up to `timeout` seconds for notifications; returns their deadlines."""
+        deadlines = []
+        for notify in self._conn.notifies(timeout=max(timeout, 0.0), stop_after=1):
+            try:
+                deadlines.append(_aware(datetime.fromisoformat(notify.payload)))
+            except ValueError:
+                continue
+        return deadlines
+
+    def close(self) -> None:
+        self._raw.close()
+
+
+class DeadlineScheduler:
+    """
+    Runs `run_due` as deadlines pass instead of on a fixed interval.
+
+    Upcoming due_at values sit in a min-heap and the loop sleeps until the earliest one.
+    New or rescheduled deadlines arrive via LISTEN/NOTIFY on Postgres (no queries while idle);
+    elsewhere the earliest pending deadline is probed every `poll_seconds`. A full sweep
+    (run_due plus a heap reload) still happens every `sweep_seconds` as a safety net.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        run_due: Callable[[], int],
+        *,
+        sweep_seconds: float = 60.0,
+        poll_seconds: float = 1.0,
+        lookahead: int = 1000,
+    ) -> None:
+        self._engine = engine
+        self._run_due = run_due
+        self.sweep_seconds = sweep_seconds
+        self.poll_seconds = poll_seconds
+        self.lookahead = lookahead
+        self._heap: list[datetime] = []
+        self._next_sweep = _now_utc()
+        self._listener: Optional[_PgDeadlineListener] = None
+        self.fired = 0
+        self.sweeps = 0
+        self.notifications = 0
+        self.probes = 0
+
+    def push(self, due_at: datetime) -> None:
+        heapq.heappush(self._heap, _aware(due_at))
+
+    def next_deadline(self) -> Optional[datetime]:
+        return self._heap[0] if self._heap else None
+
+    def reload(self) -> None:
+        with Session(self._engine) as db:
+            self._heap = _pending_deadlines(db, self.lookahead)  # sorted, hence a heap
+
+    def _run(self) -> int:
+        applied = self._run_due()
+        if applied:
+            logger.info("Deadline scheduler: applied %s missed-deadline events", applied)
+        return applied
+
+    def _fire(self, now: datetime) -> int:
+        while self._heap and self._heap[0] <= now:
+            heapq.heappop(self._heap)
+        self.fired += 1
+        applied = self._run()
+        if not self._heap:
+            # The heap only held the first `lookahead` deadlines.
+            self.reload()
+        return applied
+
+    def _sweep(self) -> int:
+        self.sweeps += 1
+        applied = self._run()
+        self.reload()
+        self._next_sweep = _now_utc() + timedelta(seconds=self.sweep_seconds)
+        return applied
+
+    def _wait(self, seconds: float) -> None:
+        if self._listener is not None:
+            try:
+                deadlines = self._listener.wait(seconds)
+            except Exception as e:  # noqa: BLE001
+                logger.warning(
+                    "Deadline scheduler: listener failed, falling back to polling: %s", e
+                )
+                self._listener.close()
+                self._listener = None
+                return
+            self.notifications += len(deadlines)
+            for due_at in deadlines:
+                self.push(due_at)
+            return
+
+        time.sleep(max(min(seconds, self.poll_seconds), 0.0))
+        self.probes += 1
+        with Session(self._engine) as db:
+            earliest = _pending_deadlines(db, 1)
+        if earliest and (not self._heap or earliest[0] < self._heap[0]):
+            self.push(earliest[0])
+
+    def run_forever(self, stop: Optional[threading.Event] = None) -> None:
+        stop = stop or threading.Event()
+        if self._engine.dialect.name == "postgresql":
+            self._listener = _PgDeadlineListener(self._engine)
+        try:
+            self._sweep()
+            while not stop.is_set():
+                now = _now_utc()
+                due = self.next_deadline()
+                if due is not None and due + _FIRE_SLACK <= now:
+                    self._fire(now)
+                    continue
+                if now >= self._next_sweep:
+                    self._sweep()
+                    continue
+                wake = self._next_sweep if due is None else min(due + _FIRE_SLACK, self._next_sweep)
+                self._wait((wake - now).total_seconds())
+        finally:
+            if self._listener is not None:
+                self._listener.close()
+
+    def stats(self) -> dict:
+        return {
+            "pending_deadlines": len(self._heap),
+            "next_deadline": self._heap[0].isoformat() if self._heap else None,
+            "fired": self.fired,
+            "sweeps": self.sweeps,
+            "notifications": self.notifications,
+            "probes": self.probes,
+        }
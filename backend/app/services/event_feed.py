@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import base64
+import json
+import uuid
+from collections.abc import Iterable, Mapping
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import String, and_, select, tuple_, type_coerce
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.enums import EventType, GroupMode
+from app.models.event import Event
+from app.models.group import Group
+from app.models.task import Task
+from app.models.user import User
+from app.schemas.state import EventOut, EventPage, UserRef
+
+# Events embedded in the state payload; older history is paged via GET /groups/{id}/events.
+EVENT_HEAD_LIMIT = 20
+EVENT_PAGE_DEFAULT = 50
+EVENT_PAGE_MAX = 100
+
+_datetime_adapter = TypeAdapter(datetime)
+
+
+def uuid_str(value: Any) -> Optional[str]:
+    # SQLite stores UUIDs as 32-char hex; normalize to the canonical dashed form.
+    if not value:
+        return None
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return str(uuid.UUID(value))
+
+
+# --- Keyset cursors --------------------------------------------------------------------------
+# The feed is ordered by (created_at DESC, id DESC), served by ix_events_group_id_created_at.
+# created_at has microsecond precision (stamped in Python), so id only breaks true ties.
+# Cursors are opaque base64 of the last row's key. SQLite keeps timestamps as text whose
+# precision varies by writer, so there the raw stored strings are compared instead of values.
+
+
+def keyset_columns(dialect: str) -> tuple[ColumnElement, ColumnElement]:
+    if dialect == "sqlite":
+        return type_coerce(Event.created_at, String), type_coerce(Event.id, String)
+    return Event.created_at, Event.id
+
+
+def encode_cursor(created_at: Any, event_id: Any) -> str:
+    ts = created_at.isoformat() if isinstance(created_at, datetime) else str(created_at)
+    raw = json.dumps([ts, str(event_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(dialect: str, cursor: str) -> tuple[Any, Any]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, event_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if dialect == "sqlite":
+            return str(ts), str(event_id)
+        return _datetime_adapter.validate_python(ts), uuid.UUID(event_id)
+    except Exception as e:  # noqa: BLE001
+        raise ValueError("Invalid cursor") from e
+
+
+# --- Serialization ---------------------------------------------------------------------------
+
+
+def serialize_events(rows: Iterable[Mapping[str, Any]], mode: GroupMode) -> list[EventOut]:
+    """
+    Turn event rows into EventOut, applying the instructor-mode privacy filter.
+
+    Rows carry: type, task_id, task_title, delta, message, created_at, actor_id, actor_name,
+    target_id, target_name (either decoded JSON or plain result mappings).
+    """
+    events: list[EventOut] = []
+    for r in rows:
+        event_type = EventType(r["type"])
+        task_id = uuid_str(r["task_id"])
+        if mode == GroupMode.INSTRUCTOR:
+            # No identities in instructor mode.
+            msg = r["message"]
+            if not msg:
+                title = r["task_title"] or "a task"
+                if event_type == EventType.TASK_MISSED and task_id:
+                    msg = f"Penalty applied for {title}"
+                elif event_type == EventType.TASK_COMPLETED and task_id:
+                    msg = f"Task completed: {title}"
+                else:
+                    msg = event_type.value
+            actor = target = None
+        else:
+            msg = r["message"]
+            actor = (
+                UserRef(id=uuid_str(r["actor_id"]), display_name=r["actor_name"])
+                if r["actor_id"]
+                else None
+            )
+            target = (
+                UserRef(id=uuid_str(r["target_id"]), display_name=r["target_name"])
+                if r["target_id"]
+                else None
+            )
+
+        events.append(
+            EventOut(
+                type=event_type,
+                task_id=task_id,
+                delta=r["delta"],
+                message=msg,
+                created_at=r["created_at"],
+                actor=actor,
+                target=target,
+            )
+        )
+    return events
+
+
+# --- Paging ----------------------------------------------------------------------------------
+
+
+def list_group_events(db: Session, group: Group, before: Optional[str], limit: int) -> EventPage:
+    dialect = db.get_bind().dialect.name
+    ts_col, id_col = keyset_columns(dialect)
+
+    actor = aliased(User, name="actor")
+    target = aliased(User, name="target")
+    event_task = aliased(Task, name="event_task")
+    q = (
+        select(
+            Event.type,
+            Event.task_id,
+            event_task.title.label("task_title"),
+            Event.delta,
+            Event.message,
+            Event.created_at,
+            actor.id.label("actor_id"),
+            actor.display_name.label("actor_name"),
+            target.id.label("target_id"),
+            target.display_name.label("target_name"),
+            ts_col.label("cursor_ts"),
+            id_col.label("cursor_id"),
+        )
+        .outerjoin(actor, actor.id == Event.actor_user_id)
+        .outerjoin(target, target.id == Event.target_user_id)
+        .outerjoin(
+            event_task, and_(event_task.id == Event.task_id, event_task.group_id == group.id)
+        )
+        .where(Event.group_id == group.id)
+        .order_by(ts_col.desc(), id_col.desc())
+        .limit(limit + 1)
+    )
+    if before:
+        ts, event_id = decode_cursor(dialect, before)
+        q = q.where(tuple_(ts_col, id_col) < (ts, event_id))
+
+    rows = db.execute(q).mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = (
+        encode_cursor(rows[-1]["cursor_ts"], rows[-1]["cursor_id"]) if has_more and rows else None
+    )
+    return EventPage(events=serialize_events(rows, group.mode), next_cursor=next_cursor)
@@ -1,25 +1,29 @@
 from __future__ import annotations
 
+import json
 import uuid
-from collections.abc import Iterable
-from typing import Optional
+from typing import Any, Optional
 
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql.elements import ColumnElement
 
 from app.deps.auth import CurrentUser
 from app.models.class_ import Class
-from app.models.enums import EventType, GroupMode, GroupRole, TaskStatusValue
+from app.models.enums import GroupMode, GroupRole, TaskStatusValue, TaskType
 from app.models.event import Event
 from app.models.group import Group
 from app.models.group_membership import GroupMembership
+from app.models.leaderboard_stat import LeaderboardStat
 from app.models.pet import Pet
 from app.models.task import Task
 from app.models.task_status import TaskStatus
+from app.models.task_tombstone import TaskTombstone
 from app.models.user import User
 from app.schemas.state import (
-    EventOut,
     GroupHeader,
+    GroupStateDelta,
     GroupStateResponse,
     LeaderboardEntry,
     PetState,
@@ -27,202 +31,445 @@ from app.schemas.state import (
     TaskStats,
     UserRef,
 )
+from app.services.event_feed import (
+    EVENT_HEAD_LIMIT,
+    encode_cursor,
+    keyset_columns,
+    serialize_events,
+    uuid_str,
+)
+from app.services.group_versions import DELTA_MAX_VERSIONS
+from app.services.state_cache import GroupSnapshot, get_group_snapshot_cache
+from app.utils.single_flight import AsyncSingleFlight, SingleFlight
 
+_snapshot_flight: SingleFlight[GroupSnapshot] = SingleFlight("group_snapshot")
+_async_snapshot_flight: AsyncSingleFlight[GroupSnapshot] = AsyncSingleFlight(
+    "group_snapshot_async"
+)
 
-def _user_map(db: Session, user_ids: Iterable[uuid.UUID]) -> dict[str, UserRef]:
-    ids = [uid for uid in set(user_ids) if uid]
-    if not ids:
-        return {}
-    rows = db.execute(select(User).where(User.id.in_(ids))).scalars().all()
-    return {str(u.id): UserRef(id=str(u.id), display_name=u.display_name) for u in rows}
+# --- Dialect helpers -------------------------------------------------------------------------
+# The whole dashboard is fetched in one statement: each list (tasks, events, leaderboard) is
+# aggregated into a JSON array by a scalar subquery. Postgres uses json_build_object/json_agg,
+# SQLite the equivalent JSON1 functions.
 
 
-def build_group_state(db: Session, group: Group, viewer: CurrentUser) -> GroupStateResponse:
-    klass = db.scalar(select(Class).where(Class.id == group.class_id))
-    assert klass is not None
+def _json_object(dialect: str, **fields: ColumnElement) -> ColumnElement:
+    args: list[Any] = []
+    for key, expr in fields.items():
+        # Keys are code constants; inline them so Postgres doesn't need to infer a param type.
+        args.extend([literal_column(f"'{key}'"), expr])
+    if dialect == "postgresql":
+        return func.json_build_object(*args)
+    return func.json_object(*args)
 
-    pet = db.scalar(select(Pet).where(Pet.group_id == group.id))
-    if pet is None:
-        # Safety: ensure group always has a pet row.
-        pet = Pet(group_id=group.id, name="Pibble", health=100, max_health=100)
-        db.add(pet)
-        db.commit()
-        db.refresh(pet)
 
-    student_count = db.scalar(
-        select(func.count())
-        .select_from(GroupMembership)
-        .where(
-            GroupMembership.group_id == group.id,
-            GroupMembership.role == GroupRole.STUDENT,
-        )
-    )
-    total_count = int(student_count or 0)
+def _json_array_agg(dialect: str, obj: ColumnElement) -> ColumnElement:
+    if dialect == "postgresql":
+        return func.json_agg(obj)
+    return func.json_group_array(obj)
+
+
+def _json_rows(value: Any) -> list[dict]:
+    # psycopg decodes json itself; SQLite hands back text. Postgres returns NULL for no rows.
+    if value is None:
+        return []
+    if isinstance(value, (str, bytes)):
+        return json.loads(value)
+    return list(value)
 
-    tasks = (
-        db.execute(select(Task).where(Task.group_id == group.id).order_by(Task.due_at.asc()))
-        .scalars()
-        .all()
+
+# --- Query -----------------------------------------------------------------------------------
+
+
+def _group_state_query(
+    dialect: str, group: Group, viewer_id: Optional[uuid.UUID], since: Optional[int] = None
+):
+    """
+    The dashboard query. Without a viewer, tasks leave out my_* (see _viewer_overlay). With
+    `since`, every list is restricted to rows stamped with a later group version (see
+    app.services.group_versions), and deleted task ids are included.
+    """
+    group_id = group.id
+    is_student_member = and_(
+        GroupMembership.group_id == group_id,
+        GroupMembership.role == GroupRole.STUDENT,
     )
-    task_ids = [t.id for t in tasks]
-
-    # My statuses (missing row => NOT_DONE)
-    my_status_rows = db.execute(
-        select(TaskStatus).where(TaskStatus.task_id.in_(task_ids), TaskStatus.user_id == viewer.id)
-    ).scalars().all()
-    my_status_by_task_id = {str(ts.task_id): ts.status for ts in my_status_rows}
-    my_grade_by_task_id = {
-        str(ts.task_id): {"letter": ts.grade_letter, "percent": ts.grade_percent}
-        for ts in my_status_rows
-        if ts.grade_letter is not None or ts.grade_percent is not None
-    }
 
-    # Done counts per task (DONE or EXCUSED)
-    done_counts_rows = db.execute(
-        select(TaskStatus.task_id, func.count())
-        .select_from(TaskStatus)
-        .join(
-            GroupMembership,
-            (GroupMembership.user_id == TaskStatus.user_id)
-            & (GroupMembership.group_id == group.id),
+    task_fields: dict[str, ColumnElement] = {
+        "id": Task.id,
+        "title": Task.title,
+        "type": Task.type,
+        "due_at": Task.due_at,
+        "penalty": Task.penalty,
+        # Maintained on write by app.services.counters
+        "done_count": Task.done_count,
+    }
+    tasks_json = select().select_from(Task).where(Task.group_id == group_id)
+    if viewer_id is not None:
+        # My statuses (missing row => NOT_DONE)
+        my_status = aliased(TaskStatus, name="my_status")
+        task_fields["my_status"] = my_status.status
+        task_fields["my_grade_letter"] = my_status.grade_letter
+        task_fields["my_grade_percent"] = my_status.grade_percent
+        tasks_json = tasks_json.outerjoin(
+            my_status, and_(my_status.task_id == Task.id, my_status.user_id == viewer_id)
         )
-        .where(
-            TaskStatus.task_id.in_(task_ids),
-            TaskStatus.status.in_([TaskStatusValue.DONE, TaskStatusValue.EXCUSED]),
-            GroupMembership.role == GroupRole.STUDENT,
+    tasks_json = tasks_json.add_columns(
+        _json_array_agg(dialect, _json_object(dialect, **task_fields))
+    )
+    if since is not None:
+        tasks_json = tasks_json.where(Task.changed_version > since)
+
+    # Head of the event feed; `seq` preserves the keyset order so the head can hand out a cursor
+    # for GET /groups/{id}/events.
+    ts_col, id_col = keyset_columns(dialect)
+    recent = (
+        select(
+            Event,
+            func.row_number().over(order_by=(ts_col.desc(), id_col.desc())).label("seq"),
         )
-        .group_by(TaskStatus.task_id)
-    ).all()
-    done_count_by_task_id = {str(task_id): int(cnt) for task_id, cnt in done_counts_rows}
-
-    task_states: list[TaskState] = []
-    for t in tasks:
-        tid = str(t.id)
-        my_grade = my_grade_by_task_id.get(tid)
-        task_states.append(
-            TaskState(
-                id=tid,
-                title=t.title,
-                type=t.type,
-                due_at=t.due_at,
-                penalty=t.penalty,
-                my_status=my_status_by_task_id.get(tid, TaskStatusValue.NOT_DONE),
-                my_grade_letter=my_grade.get("letter") if my_grade else None,
-                my_grade_percent=my_grade.get("percent") if my_grade else None,
-                stats=TaskStats(
-                    done_count=done_count_by_task_id.get(tid, 0),
-                    total_count=total_count,
+        .where(Event.group_id == group_id)
+        .order_by(ts_col.desc(), id_col.desc())
+    )
+    if since is None:
+        recent = recent.limit(EVENT_HEAD_LIMIT)
+    else:
+        # One extra row tells the caller the delta overflows the head.
+        recent = recent.where(Event.group_version > since).limit(EVENT_HEAD_LIMIT + 1)
+    recent = recent.subquery("recent_events")
+    actor = aliased(User, name="actor")
+    target = aliased(User, name="target")
+    event_task = aliased(Task, name="event_task")
+    events_json = (
+        select(
+            _json_array_agg(
+                dialect,
+                _json_object(
+                    dialect,
+                    seq=recent.c.seq,
+                    id=recent.c.id,
+                    type=recent.c.type,
+                    task_id=recent.c.task_id,
+                    task_title=event_task.title,
+                    delta=recent.c.delta,
+                    message=recent.c.message,
+                    created_at=recent.c.created_at,
+                    actor_id=actor.id,
+                    actor_name=actor.display_name,
+                    target_id=target.id,
+                    target_name=target.display_name,
                 ),
             )
         )
-
-    # Recent events (privacy filtered)
-    events = (
-        db.execute(
-            select(Event)
-            .where(Event.group_id == group.id)
-            .order_by(Event.created_at.desc())
-            .limit(50)
+        .select_from(recent)
+        .outerjoin(actor, actor.id == recent.c.actor_user_id)
+        .outerjoin(target, target.id == recent.c.target_user_id)
+        .outerjoin(
+            event_task, and_(event_task.id == recent.c.task_id, event_task.group_id == group_id)
         )
-        .scalars()
-        .all()
+        .scalar_subquery()
     )
-    task_title_by_id = {str(t.id): t.title for t in tasks}
-
-    actor_ids = [e.actor_user_id for e in events if e.actor_user_id]
-    target_ids = [e.target_user_id for e in events if e.target_user_id]
-    users = _user_map(db, actor_ids + target_ids)
-
-    recent_events: list[EventOut] = []
-    for e in events:
-        task_id = str(e.task_id) if e.task_id else None
-        if group.mode == GroupMode.INSTRUCTOR:
-            # No identities in instructor mode.
-            msg = e.message
-            if not msg:
-                if e.type == EventType.TASK_MISSED and task_id:
-                    msg = f"Penalty applied for {task_title_by_id.get(task_id, 'a task')}"
-                elif e.type == EventType.TASK_COMPLETED and task_id:
-                    msg = f"Task completed: {task_title_by_id.get(task_id, 'a task')}"
-                else:
-                    msg = e.type.value
-
-            recent_events.append(
-                EventOut(
-                    type=e.type,
-                    task_id=task_id,
-                    delta=e.delta,
-                    message=msg,
-                    created_at=e.created_at,
-                    actor=None,
-                    target=None,
+
+    columns = [
+        Class.code,
+        Class.term,
+        Class.school,
+        Pet.group_id.label("pet_group_id"),
+        Pet.name.label("pet_name"),
+        Pet.health.label("pet_health"),
+        Pet.max_health.label("pet_max_health"),
+        Pet.avatar_url.label("pet_avatar_url"),
+        Group.state_version,
+        Group.student_count,
+        tasks_json.scalar_subquery().label("tasks"),
+        events_json.label("events"),
+    ]
+
+    if since is not None:
+        removed_json = select(_json_array_agg(dialect, TaskTombstone.task_id)).where(
+            TaskTombstone.group_id == group_id, TaskTombstone.version > since
+        )
+        columns.append(removed_json.scalar_subquery().label("removed_task_ids"))
+
+    if group.mode == GroupMode.FRIEND:
+        # Leaderboard aggregates are maintained on write (app.services.leaderboard), so this
+        # costs the same regardless of how much task/event history the group has.
+        leaderboard_json = (
+            select(
+                _json_array_agg(
+                    dialect,
+                    _json_object(
+                        dialect,
+                        user_id=User.id,
+                        display_name=User.display_name,
+                        done_count=func.coalesce(LeaderboardStat.done_count, 0),
+                        missed_count=func.coalesce(LeaderboardStat.missed_count, 0),
+                    ),
                 )
             )
-        else:
-            recent_events.append(
-                EventOut(
-                    type=e.type,
-                    task_id=task_id,
-                    delta=e.delta,
-                    message=e.message,
-                    created_at=e.created_at,
-                    actor=users.get(str(e.actor_user_id)) if e.actor_user_id else None,
-                    target=users.get(str(e.target_user_id)) if e.target_user_id else None,
-                )
+            .select_from(GroupMembership)
+            .join(User, User.id == GroupMembership.user_id)
+            .outerjoin(
+                LeaderboardStat,
+                and_(
+                    LeaderboardStat.group_id == group_id,
+                    LeaderboardStat.user_id == GroupMembership.user_id,
+                ),
             )
+            .where(is_student_member)
+        )
+        if since is not None:
+            leaderboard_json = leaderboard_json.where(LeaderboardStat.changed_version > since)
+        columns.append(leaderboard_json.scalar_subquery().label("leaderboard"))
+
+    return (
+        select(*columns)
+        .select_from(Group)
+        .join(Class, Class.id == Group.class_id)
+        .outerjoin(Pet, Pet.group_id == Group.id)
+        .where(Group.id == group_id)
+    )
+
+
+# --- Assembly --------------------------------------------------------------------------------
+
+
+def _task_states(rows: list[dict], total_count: int) -> list[TaskState]:
+    task_states = [
+        TaskState(
+            id=uuid_str(r["id"]),
+            title=r["title"],
+            type=TaskType(r["type"]),
+            due_at=r["due_at"],
+            penalty=r["penalty"],
+            # Absent from viewer-independent snapshot rows; see _viewer_overlay.
+            my_status=TaskStatusValue(r.get("my_status") or TaskStatusValue.NOT_DONE),
+            my_grade_letter=r.get("my_grade_letter"),
+            my_grade_percent=r.get("my_grade_percent"),
+            stats=TaskStats(done_count=int(r["done_count"]), total_count=total_count),
+        )
+        for r in rows
+    ]
+    task_states.sort(key=lambda t: t.due_at)
+    return task_states
+
+
+def _leaderboard(rows: list[dict]) -> list[LeaderboardEntry]:
+    leaderboard = [
+        LeaderboardEntry(
+            user=UserRef(id=uuid_str(r["user_id"]), display_name=r["display_name"]),
+            done_count=int(r["done_count"]),
+            missed_count=int(r["missed_count"]),
+        )
+        for r in rows
+    ]
+    # Sort: most done, then least missed.
+    leaderboard.sort(key=lambda x: (-x.done_count, x.missed_count, x.user.display_name.lower()))
+    return leaderboard
+
+
+def _pet_state(db: Session, group: Group, row: Any) -> PetState:
+    if row["pet_group_id"] is None:
+        # Safety: ensure group always has a pet row.
+        pet = Pet(group_id=group.id, name="Pibble", health=100, max_health=100)
+        db.add(pet)
+        db.commit()
+        db.refresh(pet)
+        return PetState(
+            name=pet.name, health=pet.health, max_health=pet.max_health, avatar_url=pet.avatar_url
+        )
+    return PetState(
+        name=row["pet_name"],
+        health=row["pet_health"],
+        max_health=row["pet_max_health"],
+        avatar_url=row["pet_avatar_url"],
+    )
+
+
+def _group_header(group: Group, row: Any) -> GroupHeader:
+    return GroupHeader(
+        id=str(group.id),
+        name=group.name,
+        mode=group.mode,
+        class_={"code": row["code"], "term": row["term"], "school": row["school"]},
+    )
+
+
+def _delta_reachable(since: int, version: int) -> bool:
+    return since <= version and version - since <= DELTA_MAX_VERSIONS
+
+
+def _build_delta(
+    db: Session, group: Group, viewer: CurrentUser, since: int
+) -> Optional[GroupStateDelta]:
+    """Changes after `since` for this viewer, or None when only a full snapshot will do."""
+    if not _delta_reachable(since, group.state_version):
+        return None
+    dialect = db.get_bind().dialect.name
+    row = db.execute(_group_state_query(dialect, group, viewer.id, since)).mappings().one()
+    version = int(row["state_version"])
+    event_rows = sorted(_json_rows(row["events"]), key=lambda r: r["seq"])
+    if not _delta_reachable(since, version) or len(event_rows) > EVENT_HEAD_LIMIT:
+        return None
 
     leaderboard: Optional[list[LeaderboardEntry]] = None
     if group.mode == GroupMode.FRIEND:
-        # Simple leaderboard: count DONE rows and TASK_MISSED events (when worker is enabled).
-        member_rows = db.execute(
-            select(User, GroupMembership)
-            .join(GroupMembership, GroupMembership.user_id == User.id)
-            .where(GroupMembership.group_id == group.id, GroupMembership.role == GroupRole.STUDENT)
-        ).all()
-
-        done_rows = db.execute(
-            select(TaskStatus.user_id, func.count())
-            .where(TaskStatus.task_id.in_(task_ids), TaskStatus.status == TaskStatusValue.DONE)
-            .group_by(TaskStatus.user_id)
-        ).all()
-        done_by_user = {str(uid): int(cnt) for uid, cnt in done_rows}
-
-        missed_rows = db.execute(
-            select(Event.target_user_id, func.count())
-            .where(Event.group_id == group.id, Event.type == EventType.TASK_MISSED)
-            .group_by(Event.target_user_id)
-        ).all()
-        missed_by_user = {str(uid): int(cnt) for uid, cnt in missed_rows if uid is not None}
-
-        leaderboard = []
-        for u, _m in member_rows:
-            uid = str(u.id)
-            leaderboard.append(
-                LeaderboardEntry(
-                    user=UserRef(id=uid, display_name=u.display_name),
-                    done_count=done_by_user.get(uid, 0),
-                    missed_count=missed_by_user.get(uid, 0),
-                )
+        leaderboard = _leaderboard(_json_rows(row["leaderboard"]))
+    return GroupStateDelta(
+        version=version,
+        since=since,
+        group=_group_header(group, row),
+        pet=_pet_state(db, group, row),
+        tasks=_task_states(_json_rows(row["tasks"]), total_count=int(row["student_count"] or 0)),
+        removed_task_ids=[uuid_str(t) for t in _json_rows(row["removed_task_ids"])],
+        leaderboard=leaderboard,
+        new_events=serialize_events(event_rows, group.mode),
+    )
+
+
+def _build_snapshot(db: Session, group: Group) -> GroupSnapshot:
+    dialect = db.get_bind().dialect.name
+    row = db.execute(_group_state_query(dialect, group, viewer_id=None)).mappings().one()
+
+    event_rows = sorted(_json_rows(row["events"]), key=lambda r: r["seq"])
+    events_cursor = None
+    if len(event_rows) == EVENT_HEAD_LIMIT:
+        events_cursor = encode_cursor(event_rows[-1]["created_at"], event_rows[-1]["id"])
+
+    leaderboard: Optional[list[LeaderboardEntry]] = None
+    if group.mode == GroupMode.FRIEND:
+        leaderboard = _leaderboard(_json_rows(row["leaderboard"]))
+
+    return GroupSnapshot(
+        version=int(row["state_version"]),
+        group=_group_header(group, row),
+        pet=_pet_state(db, group, row),
+        tasks=_task_states(_json_rows(row["tasks"]), total_count=int(row["student_count"] or 0)),
+        leaderboard=leaderboard,
+        recent_events=serialize_events(event_rows, group.mode),
+        recent_events_cursor=events_cursor,
+    )
+
+
+def get_group_snapshot(db: Session, group: Group) -> GroupSnapshot:
+    """The viewer-independent state, shared by every member until the group version moves."""
+    cache = get_group_snapshot_cache()
+    if cache is not None:
+        snapshot = cache.get(group.id, group.state_version)
+        if snapshot is not None:
+            return snapshot
+
+    def build() -> GroupSnapshot:
+        built = _build_snapshot(db, group)
+        if cache is not None:
+            cache.put(group.id, built)
+        return built
+
+    # A burst of members opening the dashboard after a change shares one build.
+    snapshot, shared = _snapshot_flight.do(group.id, build)
+    if shared and snapshot.version < group.state_version:
+        # Joined a build that started before the version we already know about.
+        snapshot = _build_snapshot(db, group)
+    return snapshot
+
+
+def _viewer_overlay(
+    db: Session, group_id: uuid.UUID, viewer_id: uuid.UUID
+) -> dict[str, TaskStatus]:
+    # One lookup on the task_status primary key per group task; most tasks have no row.
+    statuses = db.scalars(
+        select(TaskStatus)
+        .join(Task, Task.id == TaskStatus.task_id)
+        .where(Task.group_id == group_id, TaskStatus.user_id == viewer_id)
+    )
+    return {str(ts.task_id): ts for ts in statuses}
+
+
+def _with_viewer_status(tasks: list[TaskState], overlay: dict[str, TaskStatus]) -> list[TaskState]:
+    if not overlay:
+        return tasks
+    result = []
+    for task in tasks:
+        mine = overlay.get(task.id)
+        if mine is not None:
+            task = task.model_copy(
+                update={
+                    "my_status": mine.status,
+                    "my_grade_letter": mine.grade_letter,
+                    "my_grade_percent": mine.grade_percent,
+                }
             )
+        result.append(task)
+    return result
+
+
+def build_group_state(
+    db: Session, group: Group, viewer: CurrentUser, since: Optional[int] = None
+) -> GroupStateResponse | GroupStateDelta:
+    """
+    Build the dashboard payload for one viewer.
 
-        # Sort: most done, then least missed.
-        leaderboard.sort(key=lambda x: (-x.done_count, x.missed_count, x.user.display_name.lower()))
+    A full snapshot is the cached group-level snapshot (one query on a miss, see
+    `_group_state_query`) plus the viewer's own task statuses. With `since` (a version the
+    client already has), only what changed after it is returned, unless that gap can't be
+    served as a delta, in which case this falls back to a full snapshot.
+    """
+    if since is not None:
+        delta = _build_delta(db, group, viewer, since)
+        if delta is not None:
+            return delta
 
+    snapshot = get_group_snapshot(db, group)
+    return _full_state(snapshot, _viewer_overlay(db, group.id, viewer.id))
+
+
+def _full_state(snapshot: GroupSnapshot, overlay: dict[str, TaskStatus]) -> GroupStateResponse:
     return GroupStateResponse(
-        group=GroupHeader(
-            id=str(group.id),
-            name=group.name,
-            mode=group.mode,
-            class_={"code": klass.code, "term": klass.term, "school": klass.school},
-        ),
-        pet=PetState(
-            name=pet.name,
-            health=pet.health,
-            max_health=pet.max_health,
-            avatar_url=pet.avatar_url,
-        ),
-        tasks=task_states,
-        leaderboard=leaderboard,
-        recent_events=recent_events,
+        version=snapshot.version,
+        group=snapshot.group,
+        pet=snapshot.pet,
+        tasks=_with_viewer_status(snapshot.tasks, overlay),
+        leaderboard=snapshot.leaderboard,
+        recent_events=snapshot.recent_events,
+        recent_events_cursor=snapshot.recent_events_cursor,
     )
 
+
+# --- Async path (ASYNC_DATABASE=true) --------------------------------------------------------
+# The queries above run unchanged through AsyncSession.run_sync (a greenlet on the event loop, no
+# thread); only the coalescing differs, since a thread-blocking SingleFlight wait would stall
+# the loop.
+
+
+async def get_group_snapshot_async(db: AsyncSession, group: Group) -> GroupSnapshot:
+    """get_group_snapshot for async routes."""
+    cache = get_group_snapshot_cache()
+    if cache is not None:
+        snapshot = cache.get(group.id, group.state_version)
+        if snapshot is not None:
+            return snapshot
+
+    async def build() -> GroupSnapshot:
+        built = await db.run_sync(_build_snapshot, group)
+        if cache is not None:
+            cache.put(group.id, built)
+        return built
+
+    snapshot, shared = await _async_snapshot_flight.do(group.id, build)
+    if shared and snapshot.version < group.state_version:
+        snapshot = await db.run_sync(_build_snapshot, group)
+    return snapshot
+
+
+async def build_group_state_async(
+    db: AsyncSession, group: Group, viewer: CurrentUser, since: Optional[int] = None
+) -> GroupStateResponse | GroupStateDelta:
+    """build_group_state for async routes."""
+    if since is not None:
+        delta = await db.run_sync(_build_delta, group, viewer, since)
+        if delta is not None:
+            return delta
+
+    snapshot = await get_group_snapshot_async(db, group)
+    overlay = await db.run_sync(_viewer_overlay, group.id, viewer.id)
+    return _full_state(snapshot, overlay)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import uuid
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.orm import Session
+
+from app.models.event import Event
+from app.models.group import Group
+from app.models.leaderboard_stat import LeaderboardStat
+from app.models.task import Task
+from app.models.task_tombstone import TaskTombstone
+from app.services.live_updates import get_live_update_hub
+from app.services.state_cache import get_group_snapshot_cache
+
+_PENDING_KEY = "pending_group_versions"
+
+# Delta sync (`?since=`) serves at most this many versions of history; older clients get a full
+# snapshot, and task tombstones older than this are pruned.
+DELTA_MAX_VERSIONS = 500
+
+# Rows written with a NULL version are "changed in this transaction"; bump_group_version stamps
+# them with the new version. (model, version column)
+_STAMPED_COLUMNS = (
+    (Task, Task.changed_version),
+    (Event, Event.group_version),
+    (LeaderboardStat, LeaderboardStat.changed_version),
+    (TaskTombstone, TaskTombstone.version),
+)
+
+
+def bump_group_version(db: Session, group_id: uuid.UUID) -> int:
+    """
+    Increment the group's state version inside the caller's transaction.
+
+    Call this from every write path that changes the group dashboard, before commit,
+    so the bump becomes visible atomically with the change itself. Live-update streams are
+    notified once the surrounding transaction commits.
+
+    Rows of this group left with a NULL version (new events, tasks/leaderboard rows marked
+    changed, tombstones) are stamped with the new version for delta sync. The group row lock
+    taken here orders stamps by commit, so a client never skips a version's changes.
+    """
+    # Pending ORM changes must be in the database before they can be stamped.
+    db.flush()
+    new_version = int(
+        db.scalar(
+            update(Group)
+            .where(Group.id == group_id)
+            .values(state_version=Group.state_version + 1)
+            .returning(Group.state_version)
+        )
+        or 0
+    )
+    if new_version:
+        for model, column in _STAMPED_COLUMNS:
+            db.execute(
+                update(model)
+                .where(model.group_id == group_id, column.is_(None))
+                .values({column.key: new_version})
+                .execution_options(synchronize_session=False)
+            )
+        db.info.setdefault(_PENDING_KEY, {})[group_id] = new_version
+    return new_version
+
+
+def mark_group_tasks_changed(db: Session, group_id: uuid.UUID) -> None:
+    """Mark every task of the group as changed (e.g. total_count moved when someone joined)."""
+    db.execute(
+        update(Task)
+        .where(Task.group_id == group_id)
+        .values(changed_version=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_task_deleted(db: Session, task: Task) -> None:
+    """Leave a tombstone for delta clients; prunes tombstones no delta can reach any more."""
+    current = select(Group.state_version).where(Group.id == task.group_id).scalar_subquery()
+    db.execute(
+        delete(TaskTombstone).where(
+            TaskTombstone.group_id == task.group_id,
+            TaskTombstone.version < current - DELTA_MAX_VERSIONS,
+        )
+    )
+    db.add(TaskTombstone(task_id=task.id, group_id=task.group_id))
+
+
+def group_state_etag(
+    group: Group, viewer_id: uuid.UUID, penalties_pending: bool = False
+) -> str:
+    # The state payload includes viewer-specific fields (my_status, my_grade_*),
+    # so the tag is scoped to the viewer as well as the group version.
+    suffix = "-p" if penalties_pending else ""
+    return f'"{group.state_version}-{viewer_id.hex}{suffix}"'
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_versions(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    hub = get_live_update_hub()
+    snapshots = get_group_snapshot_cache()
+    for group_id, version in pending.items():
+        if snapshots is not None:
+            snapshots.invalidate(group_id)
+        hub.publish(group_id, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_versions(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import uuid
+from collections.abc import Iterable, Mapping
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.db.dialects import insert_for
+from app.models.enums import EventType, TaskStatusValue
+from app.models.event import Event
+from app.models.leaderboard_stat import LeaderboardStat
+from app.models.task import Task
+from app.models.task_status import TaskStatus
+from app.services.group_versions import bump_group_version
+
+
+def add_leaderboard_counts(
+    db: Session,
+    group_id: uuid.UUID,
+    deltas: Mapping[uuid.UUID, tuple[int, int]],
+) -> None:
+    """
+    Add (done, missed) deltas per user in one upsert, inside the caller's transaction.
+
+    Rows are created on first write; see also ensure_leaderboard_row. Touched rows are left
+    for bump_group_version to stamp.
+    """
+    values = [
+        {
+            "group_id": group_id,
+            "user_id": user_id,
+            "done_count": done,
+            "missed_count": missed,
+            "changed_version": None,
+        }
+        for user_id, (done, missed) in deltas.items()
+        if done or missed
+    ]
+    _upsert_counts(db, values)
+
+
+def _upsert_counts(db: Session, values: list[dict]) -> None:
+    if not values:
+        return
+    stmt = insert_for(db)(LeaderboardStat).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LeaderboardStat.group_id, LeaderboardStat.user_id],
+        set_={
+            "done_count": LeaderboardStat.done_count + stmt.excluded.done_count,
+            "missed_count": LeaderboardStat.missed_count + stmt.excluded.missed_count,
+            "changed_version": None,
+        },
+    )
+    db.execute(stmt)
+
+
+def ensure_leaderboard_row(db: Session, group_id: uuid.UUID, user_id: uuid.UUID) -> None:
+    """Create a zeroed row for a new member so delta sync reports them on the leaderboard."""
+    stmt = insert_for(db)(LeaderboardStat).values(group_id=group_id, user_id=user_id)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[LeaderboardStat.group_id, LeaderboardStat.user_id],
+            set_={"changed_version": None},
+        )
+    )
+
+
+def record_missed(db: Session, group_id: uuid.UUID, user_ids: Iterable[uuid.UUID]) -> None:
+    deltas: dict[uuid.UUID, tuple[int, int]] = {}
+    for user_id in user_ids:
+        done, missed = deltas.get(user_id, (0, 0))
+        deltas[user_id] = (done, missed + 1)
+    add_leaderboard_counts(db, group_id, deltas)
+
+
+def record_missed_bulk(db: Session, misses: Iterable[tuple[uuid.UUID, uuid.UUID]]) -> None:
+    """record_missed for (group_id, user_id) pairs spanning any number of groups, in one upsert."""
+    counts: dict[tuple[uuid.UUID, uuid.UUID], int] = {}
+    for key in misses:
+        counts[key] = counts.get(key, 0) + 1
+    _upsert_counts(
+        db,
+        [
+            {
+                "group_id": group_id,
+                "user_id": user_id,
+                "done_count": 0,
+                "missed_count": missed,
+                "changed_version": None,
+            }
+            for (group_id, user_id), missed in sorted(counts.items())
+        ],
+    )
+
+
+def forget_task_completions(db: Session, task: Task) -> None:
+    """Drop a task's DONE rows from the leaderboard before the task is deleted."""
+    done_users = select(TaskStatus.user_id).where(
+        TaskStatus.task_id == task.id,
+        TaskStatus.status == TaskStatusValue.DONE,
+    )
+    db.execute(
+        update(LeaderboardStat)
+        .where(
+            LeaderboardStat.group_id == task.group_id,
+            LeaderboardStat.user_id.in_(done_users),
+        )
+        .values(done_count=LeaderboardStat.done_count - 1, changed_version=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rebuild_leaderboard(db: Session, group_id: Optional[uuid.UUID] = None) -> int:
+    """
+    Rebuild leaderboard rows from history (task_status + TASK_MISSED events).
+
+    Rebuilds one group, or every group when group_id is None, bumping the version of each
+    rebuilt group. Returns rows written; the caller commits.
+    """
+    done_q = (
+        select(Task.group_id, TaskStatus.user_id, func.count())
+        .join(Task, Task.id == TaskStatus.task_id)
+        .where(TaskStatus.status == TaskStatusValue.DONE)
+        .group_by(Task.group_id, TaskStatus.user_id)
+    )
+    missed_q = (
+        select(Event.group_id, Event.target_user_id, func.count())
+        .where(Event.type == EventType.TASK_MISSED, Event.target_user_id.is_not(None))
+        .group_by(Event.group_id, Event.target_user_id)
+    )
+    clear = delete(LeaderboardStat)
+    if group_id is not None:
+        done_q = done_q.where(Task.group_id == group_id)
+        missed_q = missed_q.where(Event.group_id == group_id)
+        clear = clear.where(LeaderboardStat.group_id == group_id)
+
+    counts: dict[tuple[uuid.UUID, uuid.UUID], list[int]] = {}
+    for gid, uid, cnt in db.execute(done_q):
+        counts.setdefault((gid, uid), [0, 0])[0] = int(cnt)
+    for gid, uid, cnt in db.execute(missed_q):
+        counts.setdefault((gid, uid), [0, 0])[1] = int(cnt)
+
+    db.execute(clear.execution_options(synchronize_session=False))
+    if counts:
+        db.execute(
+            insert_for(db)(LeaderboardStat),
+            [
+                {"group_id": gid, "user_id": uid, "done_count": done, "missed_count": missed}
+                for (gid, uid), (done, missed) in counts.items()
+            ],
+        )
+    rebuilt = {gid for gid, _ in counts}
+    if group_id is not None:
+        rebuilt.add(group_id)
+    for gid in rebuilt:
+        bump_group_version(db, gid)
+    return len(counts)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Optional, Protocol
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+Dispatch = Callable[[uuid.UUID, int], None]
+
+REDIS_CHANNEL_PREFIX = "protectpibble:groups:"
+
+
+class GroupSubscription:
+    """
+    One stream's view of a group's version.
+
+    Notifications coalesce: a slow consumer only ever sees the newest version, so memory per
+    subscriber stays constant no matter how many writes land between reads.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._changed = asyncio.Event()
+        self._version = 0
+
+    def notify(self, version: int) -> None:
+        # Called from whichever thread committed the write.
+        try:
+            self._loop.call_soon_threadsafe(self._set, version)
+        except RuntimeError:
+            # Event loop already closed (client went away during shutdown).
+            pass
+
+    def _set(self, version: int) -> None:
+        if version > self._version:
+            self._version = version
+            self._changed.set()
+
+    async def next_version(self, timeout: float) -> Optional[int]:
+        """Wait for a newer version; returns None on timeout so callers can send heartbeats."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._changed.clear()
+        return self._version
+
+
+class LiveUpdateBackend(Protocol):
+    def start(self, dispatch: Dispatch) -> None: ...
+
+    def publish(self, group_id: uuid.UUID, version: int) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class InProcessBackend:
+    """Fan-out within this process only (single uvicorn worker / dev)."""
+
+    def __init__(self) -> None:
+        self._dispatch: Optional[Dispatch] = None
+
+    def start(self, dispatch: Dispatch) -> None:
+        self._dispatch = dispatch
+
+    def publish(self, group_id: uuid.UUID, version: int) -> None:
+        if self._dispatch is not None:
+            self._dispatch(group_id, version)
+
+    def close(self) -> None:
+        self._dispatch = None
+
+
+class RedisBackend:
+    """
+    Redis pub/sub so every API worker (and the penalty worker) shares one notification bus.
+
+    Publishing is fire-and-forget: a lost notification only delays clients until their next poll.
+    """
+
+    def __init__(self, url: str) -> None:
+        import redis
+
+        self._redis = redis
+        self._client = redis.Redis.from_url(url)
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self, dispatch: Dispatch) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._listen, args=(dispatch,), name="live-updates-redis", daemon=True
+        )
+        self._thread.start()
+
+    def _listen(self, dispatch: Dispatch) -> None:
+        while not self._stopped.is_set():
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{REDIS_CHANNEL_PREFIX}*")
+                for message in pubsub.listen():
+                    if self._stopped.is_set():
+                        break
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    try:
+                        group_id = uuid.UUID(channel[len(REDIS_CHANNEL_PREFIX) :])
+                        version = int(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    dispatch(group_id, version)
+            except self._redis.RedisError as e:
+                logger.warning("Live updates: redis listener error: %s", e)
+                time.sleep(1.0)
+
+    def publish(self, group_id: uuid.UUID, version: int) -> None:
+        try:
+            self._client.publish(f"{REDIS_CHANNEL_PREFIX}{group_id}", str(version))
+        except self._redis.RedisError as e:
+            logger.warning("Live updates: failed to publish group %s: %s", group_id, e)
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._client.close()
+
+
+class LiveUpdateHub:
+    """Maps group ids to open streams and fans out version notifications to them."""
+
+    def __init__(self, backend: LiveUpdateBackend) -> None:
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._subscribers: dict[uuid.UUID, set[GroupSubscription]] = {}
+
+    def start(self) -> None:
+        self._backend.start(self.dispatch)
+
+    def close(self) -> None:
+        self._backend.close()
+
+    def publish(self, group_id: uuid.UUID, version: int) -> None:
+        self._backend.publish(group_id, version)
+
+    def dispatch(self, group_id: uuid.UUID, version: int) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(group_id, ()))
+        for sub in subscribers:
+            sub.notify(version)
+
+    @contextmanager
+    def subscribe(self, group_id: uuid.UUID) -> Iterator[GroupSubscription]:
+        sub = GroupSubscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(group_id, set()).add(sub)
+        try:
+            yield sub
+        finally:
+            with self._lock:
+                subs = self._subscribers.get(group_id)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[group_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "groups": len(self._subscribers),
+                "subscribers": sum(len(s) for s in self._subscribers.values()),
+            }
+
+
+@lru_cache
+def get_live_update_hub() -> LiveUpdateHub:
+    settings = get_settings()
+    backend: LiveUpdateBackend
+    if settings.live_updates_backend == "redis":
+        backend = RedisBackend(settings.redis_url)
+    else:
+        backend = InProcessBackend()
+    return LiveUpdateHub(backend)
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Callable, Optional
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.services.deadline_penalties import apply_deadline_penalties_for_group
+
+logger = logging.getLogger(__name__)
+
+
+class PenaltyQueue:
+    """
+    In-process queue of "apply deadline penalties for group X" jobs, fed by read endpoints.
+
+    Requests are deduplicated while a group is queued and debounced per group: after a run,
+    the group is not run again for `debounce_seconds`, however many readers ask. Background
+    threads run the jobs, so reads never wait on penalty writes.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[uuid.UUID], int],
+        *,
+        workers: int,
+        debounce_seconds: float,
+        max_pending: int,
+    ) -> None:
+        self._run = run
+        self.workers = workers
+        self.debounce_seconds = debounce_seconds
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._heap: list[tuple[float, uuid.UUID]] = []  # (not_before, group_id)
+        self._queued: set[uuid.UUID] = set()
+        self._running: set[uuid.UUID] = set()
+        self._last_run: dict[uuid.UUID, float] = {}
+        self._threads: list[threading.Thread] = []
+        self._stopped = False
+        self.requested = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.runs = 0
+        self.errors = 0
+        self.applied = 0
+
+    def start(self) -> None:
+        with self._cond:
+            if self._threads:
+                return
+            self._stopped = False
+            for n in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, name=f"penalty-queue-{n}", daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    def request(self, group_id: uuid.UUID) -> bool:
+        """Queue a penalty pass for the group; False if the queue is full (try again later)."""
+        now = time.monotonic()
+        with self._cond:
+            self.requested += 1
+            if group_id in self._queued:
+                self.deduplicated += 1
+                return True
+            if len(self._queued) >= self.max_pending:
+                self.dropped += 1
+                return False
+            not_before = now
+            last = self._last_run.get(group_id)
+            if last is not None:
+                not_before = max(now, last + self.debounce_seconds)
+            if group_id in self._running:
+                not_before = max(not_before, now + self.debounce_seconds)
+            self._queued.add(group_id)
+            heapq.heappush(self._heap, (not_before, group_id))
+            self._cond.notify()
+        return True
+
+    def _next_job(self) -> Optional[uuid.UUID]:
+        with self._cond:
+            while not self._stopped:
+                if self._heap:
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        _, group_id = heapq.heappop(self._heap)
+                        self._queued.discard(group_id)
+                        self._running.add(group_id)
+                        return group_id
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _work(self) -> None:
+        while (group_id := self._next_job()) is not None:
+            applied = 0
+            try:
+                applied = self._run(group_id)
+            except Exception:
+                logger.exception("Penalty queue: pass for group %s failed", group_id)
+                with self._cond:
+                    self.errors += 1
+            finally:
+                with self._cond:
+                    self._running.discard(group_id)
+                    self._last_run[group_id] = time.monotonic()
+                    self._prune_last_run()
+                    self.runs += 1
+                    self.applied += applied
+
+    def _prune_last_run(self) -> None:
+        # Only entries still inside their debounce window matter.
+        if len(self._last_run) <= self.max_pending:
+            return
+        cutoff = time.monotonic() - self.debounce_seconds
+        self._last_run = {g: t for g, t in self._last_run.items() if t > cutoff}
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queued": len(self._queued),
+                "running": len(self._running),
+                "requested": self.requested,
+                "deduplicated": self.deduplicated,
+                "dropped": self.dropped,
+                "runs": self.runs,
+                "errors": self.errors,
+                "applied": self.applied,
+            }
+
+
+def _apply_for_group(group_id: uuid.UUID) -> int:
+    with SessionLocal() as db:
+        return apply_deadline_penalties_for_group(db, group_id)
+
+
+@lru_cache
+def get_penalty_queue() -> Optional[PenaltyQueue]:
+    """The background queue, or None when reads apply penalties inline (the default)."""
+    settings = get_settings()
+    if settings.penalties_on_read != "background":
+        return None
+    queue = PenaltyQueue(
+        _apply_for_group,
+        workers=settings.penalty_queue_workers,
+        debounce_seconds=settings.penalty_queue_debounce_seconds,
+        max_pending=settings.penalty_queue_max_pending,
+    )
+    queue.start()
+    return queue
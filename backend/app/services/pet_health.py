@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import threading
+import uuid
+from collections.abc import Mapping
+from typing import Optional
+
+from sqlalchemy import case, func, select, tuple_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import get_settings
+from app.db.dialects import dialect_name
+from app.models.pet import Pet
+
+# All pet health changes go through here. Two strategies, chosen by PET_WRITE_MODE:
+#
+# - "atomic" (default): one UPDATE ... SET health = clamp(health + delta) ... RETURNING health.
+#   Concurrent writers never overwrite each other's deltas; the database serializes them.
+# - "optimistic": read (health, version) without locking, then compare-and-swap with
+#   UPDATE ... WHERE version = :seen. The UPDATE still takes the row lock, so a writer racing
+#   another one waits for its commit, then fails the version check, re-reads and retries (up
+#   to PET_CAS_MAX_RETRIES times) before falling back to the atomic update.
+#
+# Either way every write bumps pets.version, so the two can be mixed safely.
+
+
+class PetWriteStats:
+    """Contention counters for optimistic pet writes (per process)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.attempts = 0
+        self.conflicts = 0
+        self.fallbacks = 0
+        self.max_attempts = 0
+
+    def record(self, pets: int, attempts: int, conflicts: int, fell_back: bool) -> None:
+        with self._lock:
+            self.writes += pets
+            self.attempts += attempts
+            self.conflicts += conflicts
+            self.fallbacks += int(fell_back)
+            self.max_attempts = max(self.max_attempts, attempts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": get_settings().pet_write_mode,
+                "writes": self.writes,
+                "attempts": self.attempts,
+                "conflicts": self.conflicts,
+                "conflict_rate": round(self.conflicts / self.writes, 4) if self.writes else None,
+                "fallbacks": self.fallbacks,
+                "max_attempts": self.max_attempts,
+            }
+
+
+pet_write_stats = PetWriteStats()
+
+
+def clamp_health(dialect: str, value: ColumnElement, max_health: ColumnElement) -> ColumnElement:
+    """SQL for max(0, min(max_health, value))."""
+    if dialect == "postgresql":
+        return func.greatest(0, func.least(max_health, value))
+    # SQLite's multi-argument min()/max() are scalar functions.
+    return func.max(0, func.min(max_health, value))
+
+
+def _optimistic() -> bool:
+    return get_settings().pet_write_mode == "optimistic"
+
+
+def adjust_pet_health(db: Session, group_id: uuid.UUID, delta: int) -> Optional[int]:
+    """Add `delta` to the group's pet health (clamped); returns the new health, None if no pet."""
+    if delta == 0:
+        return db.scalar(select(Pet.health).where(Pet.group_id == group_id))
+    if _optimistic():
+        return _cas_adjust(db, {group_id: delta}).get(group_id)
+    return db.scalar(
+        update(Pet)
+        .where(Pet.group_id == group_id)
+        .values(
+            health=clamp_health(dialect_name(db), Pet.health + delta, Pet.max_health),
+            version=Pet.version + 1,
+        )
+        .returning(Pet.health)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def adjust_pets_health(db: Session, deltas: Mapping[uuid.UUID, int]) -> dict[uuid.UUID, int]:
+    """
+    adjust_pet_health for many groups in one statement; returns new health per updated pet.
+
+    Groups without a pet are absent from the result.
+    """
+    deltas = {group_id: delta for group_id, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+    if _optimistic():
+        return _cas_adjust(db, deltas)
+    return _atomic_adjust(db, deltas)
+
+
+def _in_lock_order(dialect: str, condition: ColumnElement[bool]) -> ColumnElement[bool]:
+    """`condition` as an UPDATE filter whose row locks are taken in group_id order."""
+    if dialect == "sqlite":
+        return condition  # one writer at a time anyway
+    # A fixed order (within the same statement) makes concurrent multi-group updates queue
+    # rather than deadlock.
+    return Pet.group_id.in_(
+        select(Pet.group_id).where(condition).order_by(Pet.group_id).with_for_update()
+    )
+
+
+def _atomic_adjust(db: Session, deltas: Mapping[uuid.UUID, int]) -> dict[uuid.UUID, int]:
+    dialect = dialect_name(db)
+    group_ids = sorted(deltas)
+    targets = _in_lock_order(dialect, Pet.group_id.in_(group_ids))
+    delta = case({group_id: deltas[group_id] for group_id in group_ids}, value=Pet.group_id)
+    rows = db.execute(
+        update(Pet)
+        .where(targets)
+        .values(
+            health=clamp_health(dialect, Pet.health + delta, Pet.max_health),
+            version=Pet.version + 1,
+        )
+        .returning(Pet.group_id, Pet.health)
+        .execution_options(synchronize_session=False)
+    )
+    return {group_id: health for group_id, health in rows}
+
+
+def _cas_adjust(db: Session, deltas: Mapping[uuid.UUID, int]) -> dict[uuid.UUID, int]:
+    """Compare-and-swap every pet in one UPDATE per round; retry only the ones that raced."""
+    dialect = dialect_name(db)
+    max_retries = get_settings().pet_cas_max_retries
+    remaining = dict(deltas)
+    results: dict[uuid.UUID, int] = {}
+    attempts = conflicts = 0
+
+    while remaining and attempts <= max_retries:
+        attempts += 1
+        seen = {
+            group_id: (health, max_health, version)
+            for group_id, health, max_health, version in db.execute(
+                select(Pet.group_id, Pet.health, Pet.max_health, Pet.version).where(
+                    Pet.group_id.in_(remaining)
+                )
+            )
+        }
+        # Pets that don't exist can't conflict; they are simply absent from the result.
+        remaining = {group_id: d for group_id, d in remaining.items() if group_id in seen}
+        if not remaining:
+            break
+        new_health = {
+            group_id: max(0, min(seen[group_id][1], seen[group_id][0] + d))
+            for group_id, d in remaining.items()
+        }
+        group_ids = sorted(remaining)
+        swapped = dict(
+            db.execute(
+                update(Pet)
+                .where(
+                    _in_lock_order(
+                        dialect,
+                        tuple_(Pet.group_id, Pet.version).in_(
+                            [(group_id, seen[group_id][2]) for group_id in group_ids]
+                        ),
+                    )
+                )
+                .values(
+                    health=case(
+                        {group_id: new_health[group_id] for group_id in group_ids},
+                        value=Pet.group_id,
+                    ),
+                    version=Pet.version + 1,
+                )
+                .returning(Pet.group_id, Pet.health)
+                .execution_options(synchronize_session=False)
+            ).all()
+        )
+        results.update(swapped)
+        raced = {group_id: d for group_id, d in remaining.items() if group_id not in swapped}
+        conflicts += len(raced)
+        remaining = raced
+
+    fell_back = bool(remaining)
+    if fell_back:
+        # Too contended: let the database serialize the rest.
+        results.update(_atomic_adjust(db, remaining))
+    pet_write_stats.record(len(deltas), attempts, conflicts, fell_back)
+    return results
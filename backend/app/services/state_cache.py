@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from app.core.config import get_settings
+from app.schemas.state import EventOut, GroupHeader, LeaderboardEntry, PetState, TaskState
+from app.utils.ttl_cache import TTLCache
+
+
+@dataclass(frozen=True)
+class GroupSnapshot:
+    """
+    The viewer-independent part of a group's state at one version.
+
+    Tasks carry NOT_DONE/no grade; the viewer's own statuses are overlaid per request.
+    """
+
+    version: int
+    group: GroupHeader
+    pet: PetState
+    tasks: list[TaskState]
+    leaderboard: Optional[list[LeaderboardEntry]]
+    recent_events: list[EventOut]
+    recent_events_cursor: Optional[str]
+
+    @property
+    def rows(self) -> int:
+        return len(self.tasks) + len(self.recent_events) + len(self.leaderboard or ())
+
+
+class GroupSnapshotCache:
+    """
+    Per-process cache of group snapshots keyed by group id.
+
+    An entry is only served while its version matches the group's current state_version, so
+    writes from other processes invalidate it too; local commits also drop it eagerly.
+    """
+
+    def __init__(self, max_groups: int, max_rows: int, ttl_seconds: float) -> None:
+        self._cache: TTLCache[uuid.UUID, GroupSnapshot] = TTLCache(
+            max_groups, ttl_seconds, max_weight=max_rows, weigher=lambda s: s.rows
+        )
+
+    def get(self, group_id: uuid.UUID, version: int) -> Optional[GroupSnapshot]:
+        # A snapshot newer than the caller's version (a write landed in between) is still fine.
+        return self._cache.get(group_id, is_fresh=lambda s: s.version >= version)
+
+    def put(self, group_id: uuid.UUID, snapshot: GroupSnapshot) -> None:
+        self._cache.set(group_id, snapshot)
+
+    def invalidate(self, group_id: uuid.UUID) -> None:
+        self._cache.pop(group_id)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+@lru_cache
+def get_group_snapshot_cache() -> Optional[GroupSnapshotCache]:
+    settings = get_settings()
+    if not settings.state_cache_enabled:
+        return None
+    return GroupSnapshotCache(
+        max_groups=settings.state_cache_max_groups,
+        max_rows=settings.state_cache_max_rows,
+        ttl_seconds=settings.state_cache_ttl_seconds,
+    )
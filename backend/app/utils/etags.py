@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from typing import Optional
+
+
+def if_none_match_matches(header: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against our current ETag.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so `W/"x"` matches `"x"`.
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    current = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
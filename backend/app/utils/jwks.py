@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import urllib.request
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import urlparse
+
+from jose import jwk
+from jose.backends.base import Key
+
+from app.core.config import get_settings
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_fetches: SingleFlight[dict[str, Key]] = SingleFlight("jwks_fetch", wait_timeout=10.0)
+
+
+def load_jwks(url: str, timeout: float = 5.0) -> dict[str, Key]:
+    """Fetch a JWK Set from an http(s) URL, a file:// URL or a plain path; keys by kid."""
+    if urlparse(url).scheme in ("http", "https"):
+        with urllib.request.urlopen(url, timeout=timeout) as response:  # noqa: S310
+            document = json.load(response)
+    else:
+        path = url[len("file://") :] if url.startswith("file://") else url
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f)
+
+    keys = {}
+    for entry in document.get("keys", []):
+        kid = entry.get("kid")
+        if not kid or entry.get("use", "sig") != "sig":
+            continue
+        try:
+            keys[kid] = jwk.construct(entry, entry.get("alg", "RS256"))
+        except Exception as e:  # noqa: BLE001
+            logger.warning("JWKS: skipping key %s: %s", kid, e)
+    return keys
+
+
+class JWKSCache:
+    """
+    Signing keys from a JWKS endpoint, by `kid`, kept in memory.
+
+    Only the very first lookup waits for a fetch. Afterwards keys older than
+    `refresh_seconds` are still served while one background thread refetches them
+    (stale-while-revalidate), so steady-state verification never touches the network. An
+    unknown kid (key rotation), or no keys yet, triggers a blocking refetch at most once per
+    `min_refetch_seconds` since the last attempt, so neither junk tokens nor an unreachable
+    issuer can cause a fetch storm. Concurrent fetches are coalesced into one.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        refresh_seconds: float = 300.0,
+        min_refetch_seconds: float = 30.0,
+        timeout: float = 5.0,
+    ) -> None:
+        self.url = url
+        self.refresh_seconds = refresh_seconds
+        self.min_refetch_seconds = min_refetch_seconds
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._keys: dict[str, Key] = {}
+        self._fetched_at: Optional[float] = None
+        self._last_attempt = -float("inf")
+        self._refreshing = False
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.stale_served = 0
+        self.background_refreshes = 0
+        self.unknown_kids = 0
+
+    def get_key(self, kid: str) -> Optional[Key]:
+        now = time.monotonic()
+        with self._lock:
+            key = self._keys.get(kid)
+            loaded = self._fetched_at is not None
+            stale = loaded and now - self._fetched_at >= self.refresh_seconds
+            may_refetch = now - self._last_attempt >= self.min_refetch_seconds
+
+        if key is not None:
+            if stale:
+                with self._lock:
+                    self.stale_served += 1
+                self._refresh_in_background()
+            return key
+
+        if loaded:
+            with self._lock:
+                self.unknown_kids += 1
+        # Throttled whether or not a fetch ever succeeded: an unreachable issuer must not turn
+        # every RS256 request into a blocking fetch.
+        if not may_refetch:
+            return None
+        self.refresh()
+        with self._lock:
+            return self._keys.get(kid)
+
+    def refresh(self) -> None:
+        """Refetch the key set now (coalesced); on failure the previous keys stay in use."""
+        try:
+            keys, _ = _fetches.do(self.url, self._fetch)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("JWKS: fetching %s failed: %s", self.url, e)
+            return
+        with self._lock:
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    def _fetch(self) -> dict[str, Key]:
+        with self._lock:
+            self._last_attempt = time.monotonic()
+            self.fetches += 1
+        try:
+            return load_jwks(self.url, timeout=self.timeout)
+        except Exception:
+            with self._lock:
+                self.fetch_errors += 1
+            raise
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing or time.monotonic() - self._last_attempt < self.min_refetch_seconds:
+                return
+            self._refreshing = True
+            self.background_refreshes += 1
+
+        def run() -> None:
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="jwks-refresh", daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            age = None if self._fetched_at is None else time.monotonic() - self._fetched_at
+            return {
+                "url": self.url,
+                "keys": sorted(self._keys),
+                "age_seconds": round(age, 1) if age is not None else None,
+                "fetches": self.fetches,
+                "fetch_errors": self.fetch_errors,
+                "stale_served": self.stale_served,
+                "background_refreshes": self.background_refreshes,
+                "unknown_kids": self.unknown_kids,
+            }
+
+
+@lru_cache
+def get_jwks_cache() -> Optional[JWKSCache]:
+    """The issuer's key cache, or None when CLERK_JWKS_URL is unset (local HS256 tokens only)."""
+    settings = get_settings()
+    if not settings.clerk_jwks_url:
+        return None
+    return JWKSCache(
+        settings.clerk_jwks_url,
+        refresh_seconds=settings.clerk_jwks_refresh_seconds,
+        min_refetch_seconds=settings.clerk_jwks_min_refetch_seconds,
+    )
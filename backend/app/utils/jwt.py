@@ -1,17 +1,63 @@
 from __future__ import annotations
 
+import hashlib
+import logging
+import os
 import secrets
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from jose import JWTError, jwt
 
 from app.core.config import get_settings
+from app.utils.jwks import get_jwks_cache
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
-# Generate a secret key if not provided (for dev only - should be set in production)
-_secret_key = settings.jwt_secret_key or secrets.token_urlsafe(32)
+
+def _load_secret_key() -> str:
+    """
+    JWT_SECRET_KEY, or else a generated key shared through JWT_SECRET_FILE.
+
+    A key generated per process would make each worker reject the others' tokens (and every
+    restart log everyone out), so the first process writes one to the file and the rest read
+    it. Still dev-only: set JWT_SECRET_KEY in production.
+    """
+    if settings.jwt_secret_key:
+        return settings.jwt_secret_key
+    path = settings.jwt_secret_file
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_urlsafe(32))
+        if settings.env != "dev":
+            logger.warning("JWT_SECRET_KEY is not set; generated a key in %s", path)
+    for _ in range(50):
+        with open(path, encoding="utf-8") as f:
+            key = f.read().strip()
+        if key:
+            return key
+        time.sleep(0.01)  # another process created the file and is still writing it
+    raise RuntimeError(f"JWT secret file {path} is empty")
+
+
+_secret_key = _load_secret_key()
+
+# Verified payloads keyed by a digest of the token, each kept until the token's own `exp`.
+# Clients resend the same token on every poll, so this skips parsing and signature checks.
+_verified_tokens: Optional[TTLCache[bytes, dict]] = (
+    TTLCache(settings.jwt_cache_max_entries, ttl_seconds=0)
+    if settings.jwt_cache_max_entries > 0
+    else None
+)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -26,10 +72,65 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+# `scope` of the short-lived tokens that only open one group's live stream.
+STREAM_TOKEN_SCOPE = "group_stream"
+
+
+def create_stream_token(user_id: uuid.UUID, group_id: uuid.UUID) -> str:
+    """
+    Short-lived token for one group's SSE stream.
+
+    EventSource cannot send headers, so this one goes in the URL, where proxies, access logs
+    and browser history keep it; it expires within STREAM_TOKEN_TTL_SECONDS and opens nothing
+    but that stream.
+    """
+    claims = {"sub": str(user_id), "grp": str(group_id), "scope": STREAM_TOKEN_SCOPE}
+    return create_access_token(claims, timedelta(seconds=settings.stream_token_ttl_seconds))
+
+
 def decode_access_token(token: str) -> Optional[dict]:
-    """Decode and verify a JWT token."""
+    """Decode and verify a JWT token (verified payloads are cached until they expire)."""
+    if _verified_tokens is None:
+        return _verify(token)
+
+    key = hashlib.sha256(token.encode()).digest()
+    cached = _verified_tokens.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    payload = _verify(token)
+    if payload is not None and isinstance(payload.get("exp"), (int, float)):
+        remaining = payload["exp"] - time.time()
+        if remaining > 0:
+            _verified_tokens.set(key, dict(payload), ttl_seconds=remaining)
+    return payload
+
+
+def _verify(token: str) -> Optional[dict]:
     try:
-        payload = jwt.decode(token, _secret_key, algorithms=[settings.jwt_algorithm])
-        return payload
+        jwks = get_jwks_cache()
+        if jwks is not None:
+            header = jwt.get_unverified_header(token)
+            if header.get("alg") == "RS256":
+                return _verify_with_jwks(token, jwks.get_key(header.get("kid") or ""))
+        return jwt.decode(token, _secret_key, algorithms=[settings.jwt_algorithm])
     except JWTError:
         return None
+
+
+def _verify_with_jwks(token: str, key) -> Optional[dict]:
+    # Issuer tokens (e.g. Clerk) are checked against its published keys; RS256 only, so a
+    # public key can never be used as an HMAC secret.
+    if key is None:
+        return None
+    return jwt.decode(
+        token,
+        key,
+        algorithms=["RS256"],
+        issuer=settings.clerk_issuer or None,
+        options={"verify_aud": False},
+    )
+
+
+def verified_token_cache_stats() -> Optional[dict]:
+    return _verified_tokens.stats() if _verified_tokens is not None else None
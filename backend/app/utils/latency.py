@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from collections.abc import Sequence
+
+# Upper bounds in milliseconds; the last bucket catches everything slower.
+DEFAULT_BUCKETS_MS: tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket latency histogram (milliseconds) with count/mean/max."""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS) -> None:
+        self._bounds = tuple(buckets_ms)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        with self._lock:
+            self._counts[bisect.bisect_left(self._bounds, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def mean_seconds(self) -> float:
+        with self._lock:
+            return self.total_ms / self.count / 1000.0 if self.count else 0.0
+
+    def _percentile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation (max for the overflow bucket).
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self._bounds, self._counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def stats(self) -> dict:
+        with self._lock:
+            labels = [f"le_{bound:g}ms" for bound in self._bounds] + ["inf"]
+            return {
+                "count": self.count,
+                "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+                "p50_ms": round(self._percentile(0.5), 3) if self.count else None,
+                "p95_ms": round(self._percentile(0.95), 3) if self.count else None,
+                "max_ms": round(self.max_ms, 3),
+                "buckets": dict(zip(labels, self._counts)),
+            }
@@ -1,21 +1,171 @@
 from __future__ import annotations
 
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Optional, TypeVar
+
 import bcrypt
 
+from app.core.config import get_settings
+from app.utils.latency import LatencyHistogram
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# Never calibrate below this cost, however slow the CPU; bcrypt allows 4-31. 12 is what
+# bcrypt.gensalt() used for every hash stored before calibration existed.
+MIN_ROUNDS = 12
+MAX_ROUNDS = 16
+
+
+class PasswordHasherBusy(Exception):
+    """Raised instead of queueing when the password hasher is saturated."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Password hashing is saturated")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    Dedicated, bounded pool for bcrypt work (bcrypt releases the GIL, so threads suffice).
+
+    At most `workers` hashes run at once and `max_queue` more may wait; anything beyond that
+    is refused at once with PasswordHasherBusy. Callers block on their own hash only, so
+    password work can hold at most workers + max_queue request threads, leaving the rest of
+    the server's threadpool to cheap endpoints during a login burst.
+    """
+
+    def __init__(self, workers: int, max_queue: int, rounds: int) -> None:
+        self.workers = workers
+        self.rounds = rounds
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait = LatencyHistogram()
+        self.run = LatencyHistogram()
+
+    def submit(self, fn: Callable[..., T], *args: object) -> T:
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordHasherBusy(self._retry_after())
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        queued_at = time.perf_counter()
+        try:
+            return self._executor.submit(self._timed, fn, queued_at, *args).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.completed += 1
+
+    def _timed(self, fn: Callable[..., T], queued_at: float, *args: object) -> T:
+        started = time.perf_counter()
+        self.wait.observe(started - queued_at)
+        try:
+            return fn(*args)
+        finally:
+            self.run.observe(time.perf_counter() - started)
+
+    def _retry_after(self) -> int:
+        # Time for the current backlog to drain, rounded up to whole seconds.
+        per_hash = self.run.mean_seconds() or 0.25
+        return max(1, math.ceil(self._in_flight * per_hash / self.workers))
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = self._in_flight
+            counters = {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": in_flight,
+                "max_in_flight": self.max_in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+        return {**counters, "wait": self.wait.stats(), "run": self.run.stats()}
+
+
+def time_hash(rounds: int, samples: int = 1) -> float:
+    """Best-of-`samples` seconds for one bcrypt hash at `rounds` on this CPU."""
+    best = math.inf
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate_rounds(target_seconds: float) -> int:
+    """
+    The highest cost whose hash (and so verify) fits in `target_seconds` on this CPU.
+
+    Each extra round doubles the work, so one measurement at MIN_ROUNDS predicts the rest.
+    Never below MIN_ROUNDS or above MAX_ROUNDS.
+    """
+    base = time_hash(MIN_ROUNDS, samples=3)
+    rounds = MIN_ROUNDS
+    while rounds < MAX_ROUNDS and base * 2 ** (rounds + 1 - MIN_ROUNDS) <= target_seconds:
+        rounds += 1
+    return rounds
+
+
+@lru_cache
+def get_password_hasher() -> PasswordHasher:
+    settings = get_settings()
+    rounds = settings.password_hash_rounds
+    if not rounds:
+        rounds = calibrate_rounds(settings.password_hash_target_ms / 1000.0)
+        logger.info(
+            "Calibrated bcrypt cost %s for a %sms target", rounds, settings.password_hash_target_ms
+        )
+    return PasswordHasher(
+        workers=settings.password_hash_workers,
+        max_queue=settings.password_hash_max_queue,
+        rounds=rounds,
+    )
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """The cost a bcrypt hash was made with ("$2b$12$..." -> 12), None if unparseable."""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True when the hash's cost is below the current one (upgrade it on next login).
+
+    Only upward: a process that calibrated lower never weakens a stored hash, and workers
+    that disagree on the cost don't rehash the same user back and forth.
+    """
+    rounds = hash_rounds(hashed_password)
+    return rounds is not None and rounds < get_password_hasher().rounds
+
+
+def _hash(password: str, rounds: int) -> str:
     # Convert password to bytes
     password_bytes = password.encode('utf-8')
     # Generate salt and hash
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds)
     hashed = bcrypt.hashpw(password_bytes, salt)
     # Return as string
     return hashed.decode('utf-8')
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash."""
+def _check(plain_password: str, hashed_password: str) -> bool:
     try:
         # Convert to bytes
         password_bytes = plain_password.encode('utf-8')
@@ -24,3 +174,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return bcrypt.checkpw(password_bytes, hashed_bytes)
     except Exception:
         return False
+
+
+def hash_password(password: str) -> str:
+    """Hash a password using bcrypt (raises PasswordHasherBusy when saturated)."""
+    hasher = get_password_hasher()
+    return hasher.submit(_hash, password, hasher.rounds)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash (raises PasswordHasherBusy when saturated)."""
+    return get_password_hasher().submit(_check, plain_password, hashed_password)
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Hashable
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+_registry: dict[str, SingleFlight | AsyncSingleFlight] = {}
+_registry_lock = threading.Lock()
+
+
+class _Call(Generic[T]):
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    Collapse concurrent calls for the same key into one execution (per process).
+
+    The first caller runs `fn`; callers arriving while it runs block and receive its result
+    (or its exception). A follower that waits longer than `wait_timeout` runs `fn` itself.
+    """
+
+    def __init__(self, name: str, wait_timeout: Optional[float] = 30.0) -> None:
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call[T]] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.max_waiters = 0
+        with _registry_lock:
+            _registry[name] = self
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> tuple[T, bool]:
+        """Returns (result, shared); `shared` is True when another caller's run was reused."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                with self._lock:
+                    self.timeouts += 1
+                return fn(), False
+            if call.error is not None:
+                raise call.error
+            return call.result, True  # type: ignore[return-value]
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self.executions + self.coalesced
+            return {
+                "calls": calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "coalesced_rate": round(self.coalesced / calls, 4) if calls else None,
+                "in_flight": len(self._calls),
+                "max_waiters": self.max_waiters,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+            }
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+class AsyncSingleFlight(Generic[T]):
+    """
+    SingleFlight for coroutines on one event loop.
+
+    Followers await the leader's future instead of blocking a thread (which would stall the
+    loop the leader needs). If the leader is cancelled (e.g. its client went away), followers
+    run `fn` themselves rather than failing with it.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Future[T]] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_waiters = 0
+        self._waiters: dict[Hashable, int] = {}
+        with _registry_lock:
+            _registry[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Returns (result, shared); `shared` is True when another caller's run was reused."""
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+            self._waiters[key] = self._waiters.get(key, 0) + 1
+            self.max_waiters = max(self.max_waiters, self._waiters[key])
+            try:
+                return await asyncio.shield(call), True
+            except _LeaderCancelled:
+                return await fn(), False
+
+        call = self._calls[key] = asyncio.get_running_loop().create_future()
+        self._waiters[key] = 0
+        self.executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            self.errors += 1
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+            del self._waiters[key]
+            # There may be no followers: mark any exception retrieved so asyncio doesn't log it.
+            call.exception()
+
+    def stats(self) -> dict:
+        calls = self.executions + self.coalesced
+        return {
+            "calls": calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / calls, 4) if calls else None,
+            "in_flight": len(self._calls),
+            "max_waiters": self.max_waiters,
+            "errors": self.errors,
+        }
+
+
+def single_flight_stats() -> dict[str, dict]:
+    with _registry_lock:
+        flights = list(_registry.values())
+    return {flight.name: flight.stats() for flight in flights}
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+
+# The app builds its engine from settings at import time, so point it at a scratch SQLite file
+# before anything under app/ is imported: tests never touch the database in DATABASE_URL.
+_tmpdir = tempfile.mkdtemp(prefix="protectpibble-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'test.sqlite3')}"
+os.environ["JWT_SECRET_KEY"] = "test-secret-key"  # keeps tests from writing .jwt_secret
+
+import pytest  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import engine  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _schema():
+    Base.metadata.create_all(bind=engine)
+    yield
+    engine.dispose()
+    shutil.rmtree(_tmpdir, ignore_errors=True)
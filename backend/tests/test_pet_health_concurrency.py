@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app.api.routes.tasks import complete_task
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.deps.auth import CurrentUser
+from app.models import (
+    Class,
+    Group,
+    GroupMembership,
+    GroupMode,
+    GroupRole,
+    Pet,
+    Task,
+    TaskStatusValue,
+    TaskType,
+    User,
+)
+from app.schemas.tasks import CompleteTaskRequest
+from app.services.pet_health import pet_write_stats
+
+STUDENTS = 12
+ROUNDS = 3
+
+START_HEALTH = 900
+MAX_HEALTH = 1000
+
+# Per task, each student: F (-5), regrade to A+ (+1), undo, F again: net -5.
+STEPS = (
+    CompleteTaskRequest(status=TaskStatusValue.DONE, grade_letter="F"),
+    CompleteTaskRequest(status=TaskStatusValue.DONE, grade_letter="A+"),
+    CompleteTaskRequest(status=TaskStatusValue.NOT_DONE),
+    CompleteTaskRequest(status=TaskStatusValue.DONE, grade_letter="F"),
+)
+NET_PER_TASK = -5
+
+# SQLite answers write contention with "database is locked"; a client would retry.
+MAX_LOCKED_RETRIES = 500
+
+
+def _setup() -> tuple[uuid.UUID, list[uuid.UUID], list[CurrentUser]]:
+    tag = uuid.uuid4().hex[:8]
+    with SessionLocal() as db:
+        klass = Class(code=f"STRESS-{tag}", term="stress")
+        users = [
+            User(email=f"stress-{tag}-{n}@example.invalid", display_name=f"stress {n}")
+            for n in range(STUDENTS)
+        ]
+        db.add_all([klass, *users])
+        db.flush()
+        group = Group(
+            class_id=klass.id,
+            mode=GroupMode.FRIEND,
+            name=f"stress {tag}",
+            invite_code=f"S{tag}".upper()[:16],
+            created_by_id=users[0].id,
+            student_count=STUDENTS,
+        )
+        db.add(group)
+        db.flush()
+        db.add(Pet(group_id=group.id, health=START_HEALTH, max_health=MAX_HEALTH))
+        db.add_all(
+            GroupMembership(group_id=group.id, user_id=u.id, role=GroupRole.STUDENT) for u in users
+        )
+        due = datetime.now(timezone.utc) + timedelta(days=1)
+        tasks = [
+            Task(
+                group_id=group.id,
+                title=f"exam {n}",
+                type=TaskType.EXAM,
+                due_at=due,
+                created_by_id=users[0].id,
+            )
+            for n in range(ROUNDS)
+        ]
+        db.add_all(tasks)
+        db.commit()
+        students = [CurrentUser(id=u.id, email=u.email, display_name=u.display_name) for u in users]
+        return group.id, [t.id for t in tasks], students
+
+
+def _run_student(student: CurrentUser, task_ids: list[uuid.UUID]) -> None:
+    """Play every step for every task as one student."""
+    for task_id in task_ids:
+        for body in STEPS:
+            for _ in range(MAX_LOCKED_RETRIES):
+                try:
+                    with SessionLocal() as db:
+                        complete_task(str(task_id), body, db=db, user=student)
+                    break
+                except OperationalError:
+                    time.sleep(0.01)
+            else:
+                raise AssertionError("database stayed locked")
+
+
+@pytest.mark.parametrize("mode", ["atomic", "optimistic"])
+def test_parallel_completions_lose_no_pet_updates(mode: str, monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "pet_write_mode", mode)
+    writes_before = pet_write_stats.writes
+    group_id, task_ids, students = _setup()
+
+    with ThreadPoolExecutor(max_workers=STUDENTS) as pool:
+        list(pool.map(lambda s: _run_student(s, task_ids), students))
+
+    with SessionLocal() as db:
+        health = db.scalar(select(Pet.health).where(Pet.group_id == group_id))
+    assert health == START_HEALTH + NET_PER_TASK * STUDENTS * ROUNDS
+    if mode == "optimistic":
+        assert pet_write_stats.writes > writes_before
+    else:
+        assert pet_write_stats.writes == writes_before
@@ -1,131 +1,104 @@
 from __future__ import annotations
 
+import logging
 import os
-import time
+import socket
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
-from sqlalchemy import func, select
-from sqlalchemy.exc import IntegrityError
+from app.db.session import SessionLocal, engine
+from app.services.deadline_penalties import (
+    apply_penalties_to_tasks,
+    claim_overdue_tasks,
+    release_task_claims,
+)
+from app.services.deadline_scheduler import DeadlineScheduler
 
-from app.db.session import SessionLocal
-from app.models.enums import EventType, GroupRole, TaskStatusValue
-from app.models.event import Event
-from app.models.group_membership import GroupMembership
-from app.models.pet import Pet
-from app.models.task import Task
-from app.models.task_status import TaskStatus
+# Overdue tasks claimed (and committed) per transaction.
+BATCH_SIZE = int(os.getenv("WORKER_BATCH_SIZE", "500"))
+# Claiming threads in this process; run more processes/hosts for more throughput.
+CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "1"))
+# SQLite only: how long a claim survives a worker that died mid-batch.
+LEASE_SECONDS = float(os.getenv("WORKER_LEASE_SECONDS", "60"))
+# Without Postgres LISTEN/NOTIFY, how often to check for new or moved deadlines.
+POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "1"))
 
 
-def apply_deadline_penalties_once() -> int:
+def _worker_id(slot: int) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{slot}"
+
+
+def process_batch(worker_id: str, batch_size: int = BATCH_SIZE) -> tuple[int, int]:
     """
-    Apply penalties for overdue tasks where penalty_applied_at is NULL.
+    Claim one batch of overdue tasks and apply their penalties in one transaction.
+
+    Returns (tasks claimed, penalties applied); (0, 0) means nothing is left to claim.
 
     Idempotency:
-    - insert TASK_MISSED event protected by unique index (type, task_id, target_user_id)
-    - only if insert succeeds, decrement pet health
+    - TASK_MISSED events are inserted with ON CONFLICT DO NOTHING against the unique index
+      (type, task_id, target_user_id)
+    - pet health only moves by the deltas of rows that were actually inserted
     """
     now = datetime.now(timezone.utc)
-    applied_events = 0
-
     with SessionLocal() as db:
-        tasks = (
-            db.execute(
-                select(Task)
-                .where(Task.due_at < now, Task.penalty_applied_at.is_(None))
-                .order_by(Task.due_at.asc())
-            )
-            .scalars()
-            .all()
+        task_ids = claim_overdue_tasks(
+            db, now=now, limit=batch_size, worker_id=worker_id, lease_seconds=LEASE_SECONDS
         )
+        if not task_ids:
+            db.rollback()
+            return 0, 0
+        applied = apply_penalties_to_tasks(db, task_ids, now)
+        release_task_claims(db, task_ids)
+        db.commit()
+    return len(task_ids), sum(applied.values())
+
 
-        for task in tasks:
-            # Per-task transaction keeps pet health + event log consistent.
-            with db.begin():
-                pet = db.scalar(select(Pet).where(Pet.group_id == task.group_id).with_for_update())
-                if pet is None:
-                    pet = Pet(group_id=task.group_id, name="Pibble", health=100, max_health=100)
-                    db.add(pet)
-                    db.flush()
-
-                members = (
-                    db.execute(
-                        select(GroupMembership.user_id)
-                        .where(
-                            GroupMembership.group_id == task.group_id,
-                            GroupMembership.role == GroupRole.STUDENT,
-                        )
-                        .order_by(GroupMembership.joined_at.asc())
-                    )
-                    .scalars()
-                    .all()
-                )
-
-                for user_id in members:
-                    status = db.scalar(
-                        select(TaskStatus.status).where(
-                            TaskStatus.task_id == task.id,
-                            TaskStatus.user_id == user_id,
-                        )
-                    )
-                    if status in (TaskStatusValue.DONE, TaskStatusValue.EXCUSED):
-                        continue
-
-                    # Cross-DB idempotency: check before insert
-                    # (SQLite doesn't support our Postgres partial unique index).
-                    existing_missed = db.scalar(
-                        select(func.count())
-                        .select_from(Event)
-                        .where(
-                            Event.group_id == task.group_id,
-                            Event.type == EventType.TASK_MISSED,
-                            Event.task_id == task.id,
-                            Event.target_user_id == user_id,
-                        )
-                    )
-                    if int(existing_missed or 0) > 0:
-                        continue
-
-                    # Savepoint per user keeps the overall task transaction alive.
-                    try:
-                        with db.begin_nested():
-                            db.add(
-                                Event(
-                                    group_id=task.group_id,
-                                    type=EventType.TASK_MISSED,
-                                    actor_user_id=None,  # system
-                                    target_user_id=user_id,
-                                    task_id=task.id,
-                                    delta=-int(task.penalty),
-                                    message=None,
-                                )
-                            )
-                            db.flush()  # may raise IntegrityError if already inserted
-                    except IntegrityError:
-                        continue
-
-                    applied_events += 1
-                    pet.health = max(0, min(pet.max_health, pet.health - int(task.penalty)))
-
-                task.penalty_applied_at = now
-
-    return applied_events
-
-
-def run_forever(interval_seconds: int) -> None:
+def drain(worker_id: str, batch_size: int = BATCH_SIZE) -> int:
+    """Process batches until no overdue task is left unclaimed; returns penalties applied."""
+    applied_events = 0
     while True:
-        applied = apply_deadline_penalties_once()
-        if applied:
-            print(f"[worker] applied {applied} missed-deadline events")
-        time.sleep(interval_seconds)
+        claimed, applied = process_batch(worker_id, batch_size)
+        if not claimed:
+            return applied_events
+        applied_events += applied
+
+
+def apply_deadline_penalties_once(
+    concurrency: int = CONCURRENCY, batch_size: int = BATCH_SIZE
+) -> int:
+    """
+    Apply penalties for overdue tasks where penalty_applied_at is NULL.
+
+    `concurrency` threads claim disjoint batches in parallel; other worker processes running
+    the same loop take their own batches, so catch-up scales with the number of workers.
+    """
+    if concurrency <= 1:
+        return drain(_worker_id(0), batch_size)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="penalties") as pool:
+        results = pool.map(lambda slot: drain(_worker_id(slot), batch_size), range(concurrency))
+        return sum(results)
+
+
+def run_forever(sweep_seconds: int) -> None:
+    scheduler = DeadlineScheduler(
+        engine,
+        apply_deadline_penalties_once,
+        sweep_seconds=sweep_seconds,
+        poll_seconds=POLL_SECONDS,
+    )
+    scheduler.run_forever()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     interval = int(os.getenv("WORKER_INTERVAL_SECONDS", "60"))
     once = os.getenv("WORKER_ONCE", "0") == "1"
     if once:
         n = apply_deadline_penalties_once()
         print(f"[worker] applied {n} missed-deadline events")
     else:
-        print(f"[worker] starting deadline penalty loop (interval={interval}s)")
+        print(
+            f"[worker] starting deadline scheduler (sweep every {interval}s, "
+            f"concurrency={CONCURRENCY}, batch_size={BATCH_SIZE})"
+        )
         run_forever(interval)
-
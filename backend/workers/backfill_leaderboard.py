@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import os
+import uuid
+
+from app.db.session import SessionLocal
+from app.services.leaderboard import rebuild_leaderboard
+
+
+def backfill_leaderboard(group_id: str | None = None) -> int:
+    """Rebuild leaderboard_stats from task_status and TASK_MISSED history."""
+    with SessionLocal() as db:
+        rows = rebuild_leaderboard(db, uuid.UUID(group_id) if group_id else None)
+        db.commit()
+    return rows
+
+
+if __name__ == "__main__":
+    group = os.getenv("BACKFILL_GROUP_ID") or None
+    n = backfill_leaderboard(group)
+    scope = f"group {group}" if group else "all groups"
+    print(f"[backfill] wrote {n} leaderboard rows for {scope}")
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from app.core.config import get_settings
+from app.utils.password import MAX_ROUNDS, MIN_ROUNDS, calibrate_rounds, time_hash
+
+# "10-14" or "12"; each cost is timed on one thread and on THREADS threads.
+ROUNDS = os.getenv("BENCH_ROUNDS", f"{MIN_ROUNDS}-14")
+THREADS = int(os.getenv("BENCH_THREADS", str(os.cpu_count() or 1)))
+SECONDS = float(os.getenv("BENCH_SECONDS", "2"))
+
+
+def _parse_rounds(spec: str) -> range:
+    low, _, high = spec.partition("-")
+    return range(int(low), int(high or low) + 1)
+
+
+def _throughput(rounds: int, threads: int, seconds: float) -> float:
+    """Hashes per second across `threads` hashing back to back for about `seconds`."""
+    salt = bcrypt.gensalt(rounds)
+    deadline = time.perf_counter() + seconds
+
+    def loop() -> int:
+        done = 0
+        while done == 0 or time.perf_counter() < deadline:
+            bcrypt.hashpw(b"benchmark", salt)
+            done += 1
+        return done
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        total = sum(pool.map(lambda _: loop(), range(threads)))
+    return total / (time.perf_counter() - started)
+
+
+def run_bench() -> None:
+    """Print hash latency and hashes/sec (per core and total) for each bcrypt cost."""
+    settings = get_settings()
+    print(f"[bench] {THREADS} threads, ~{SECONDS:g}s per measurement")
+    print(f"{'cost':>4}  {'ms/hash':>9}  {'hash/s/core':>11}  {'hash/s total':>12}")
+    for rounds in _parse_rounds(ROUNDS):
+        single = time_hash(rounds, samples=2)
+        total = _throughput(rounds, THREADS, SECONDS) if THREADS > 1 else 1 / single
+        print(f"{rounds:>4}  {single * 1000:>9.1f}  {1 / single:>11.2f}  {total:>12.2f}")
+
+    target = settings.password_hash_target_ms
+    rounds = calibrate_rounds(target / 1000.0)
+    configured = settings.password_hash_rounds or "auto"
+    print(
+        f"[bench] calibration picks cost {rounds} for a {target}ms target "
+        f"(range {MIN_ROUNDS}-{MAX_ROUNDS}); PASSWORD_HASH_ROUNDS={configured}"
+    )
+
+
+if __name__ == "__main__":
+    run_bench()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+# A stand-in for an external issuer (e.g. Clerk): an RSA key, its JWKS and tokens signed with it.
+DIR = Path(os.getenv("DEV_ISSUER_DIR", ".dev_issuer"))
+ISSUER = os.getenv("DEV_ISSUER", "http://127.0.0.1:8790")
+SUB = os.getenv("DEV_ISSUER_SUB", "")  # a users.id to sign a token for
+TTL_SECONDS = int(os.getenv("DEV_ISSUER_TTL_SECONDS", "3600"))
+SERVE_PORT = int(os.getenv("DEV_ISSUER_SERVE_PORT", "0"))  # serve the JWKS over HTTP
+ROTATE = os.getenv("DEV_ISSUER_ROTATE", "0") == "1"  # new key; the JWKS keeps the old one too
+
+
+def _load_keys() -> list[tuple[str, bytes]]:
+    """(kid, private PEM) pairs, newest last; creates the first key on demand."""
+    DIR.mkdir(parents=True, exist_ok=True)
+    keys = sorted(DIR.glob("*.pem"), key=lambda p: p.stat().st_mtime)
+    if not keys or ROTATE:
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        path = DIR / f"{uuid.uuid4().hex[:12]}.pem"
+        path.write_bytes(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        )
+        keys.append(path)
+    return [(p.stem, p.read_bytes()) for p in keys]
+
+
+def write_jwks(keys: list[tuple[str, bytes]]) -> Path:
+    entries = []
+    for kid, pem in keys:
+        public = jwk.construct(pem, "RS256").public_key().to_dict()
+        entries.append({**public, "kid": kid, "use": "sig", "alg": "RS256"})
+    path = DIR / "jwks.json"
+    path.write_text(json.dumps({"keys": entries}, indent=2))
+    return path
+
+
+def sign(kid: str, pem: bytes, sub: str) -> str:
+    now = int(time.time())
+    claims = {"sub": sub, "iss": ISSUER, "iat": now, "exp": now + TTL_SECONDS}
+    return jwt.encode(claims, pem.decode(), algorithm="RS256", headers={"kid": kid})
+
+
+def _serve(path: Path) -> None:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            body = path.read_bytes()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+            return
+
+    server = ThreadingHTTPServer(("127.0.0.1", SERVE_PORT), Handler)
+    print(f"[dev-issuer] serving JWKS at http://127.0.0.1:{SERVE_PORT}/ (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    keys = _load_keys()
+    jwks_path = write_jwks(keys)
+    print(f"[dev-issuer] CLERK_JWKS_URL=file://{jwks_path.resolve()}  CLERK_ISSUER={ISSUER}")
+    if SUB:
+        kid, pem = keys[-1]
+        print(sign(kid, pem, SUB))
+    if SERVE_PORT:
+        _serve(jwks_path)
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import os
+
+from app.db.session import SessionLocal
+from app.services.counters import reconcile_counters
+
+
+def reconcile_once(fix: bool = True) -> int:
+    """
+    Recompute denormalized counters (task done counts, group student counts) and report drift.
+
+    Returns the number of drifted rows found.
+    """
+    with SessionLocal() as db:
+        report = reconcile_counters(db, fix=fix)
+        if fix:
+            db.commit()
+
+    for d in report.drift:
+        print(f"[reconcile] {d.kind} {d.id}: stored={d.stored} actual={d.actual}")
+    action = "fixed" if fix else "found"
+    print(
+        f"[reconcile] checked {report.tasks_checked} tasks, {report.groups_checked} groups; "
+        f"{action} {len(report.drift)} drifted counters"
+    )
+    return len(report.drift)
+
+
+if __name__ == "__main__":
+    dry_run = os.getenv("RECONCILE_DRY_RUN", "0") == "1"
+    reconcile_once(fix=not dry_run)
@@ -134,8 +134,29 @@ export const api = {
   deleteGroup: (groupId: string) =>
     apiFetch<{ ok: boolean }>(`/groups/${groupId}`, { method: 'DELETE' }),
 
-  getGroupState: (groupId: string) =>
-    apiFetch<import('./types').GroupStateResponse>(`/groups/${groupId}/state`),
+  getGroupState: (groupId: string, since?: number) =>
+    apiFetch<import('./types').GroupStateResponse | import('./types').GroupStateDelta>(
+      since === undefined ? `/groups/${groupId}/state` : `/groups/${groupId}/state?since=${since}`,
+    ),
+  getGroupEvents: (groupId: string, before?: string | null, limit?: number) => {
+    const qs = new URLSearchParams()
+    if (before) qs.set('before', before)
+    if (limit) qs.set('limit', String(limit))
+    const query = qs.toString()
+    return apiFetch<import('./types').EventPage>(
+      `/groups/${groupId}/events${query ? `?${query}` : ''}`,
+    )
+  },
+  // EventSource can't send headers, so the URL carries a short-lived token that only opens
+  // this group's stream; the login token never lands in a URL (or in access logs).
+  groupStreamUrl: async (groupId: string): Promise<string> => {
+    const { streamToken } = await apiFetch<import('./types').StreamTokenResponse>(
+      `/groups/${groupId}/stream-token`,
+      { method: 'POST' },
+    )
+    const qs = new URLSearchParams({ stream_token: streamToken })
+    return `${getApiBaseUrl()}/groups/${groupId}/stream?${qs.toString()}`
+  },
 
   // Tasks
   createTask: (groupId: string, req: import('./types').CreateTaskRequest) =>
@@ -0,0 +1,46 @@
+import type { GroupStateDelta, GroupStateResponse, LeaderboardEntry } from './types'
+
+// Matches the size of the event head embedded in a full snapshot.
+const RECENT_EVENTS_LIMIT = 20
+
+function byId<T>(items: T[], key: (item: T) => string): Map<string, T> {
+  return new Map(items.map((item) => [key(item), item]))
+}
+
+function sortLeaderboard(rows: LeaderboardEntry[]): LeaderboardEntry[] {
+  // Same order as the backend: most done, then least missed, then name.
+  return [...rows].sort(
+    (a, b) =>
+      b.doneCount - a.doneCount ||
+      a.missedCount - b.missedCount ||
+      a.user.displayName.toLowerCase().localeCompare(b.user.displayName.toLowerCase()),
+  )
+}
+
+/** Apply a `?since=` delta to the snapshot it was requested against. */
+export function applyGroupStateDelta(
+  prev: GroupStateResponse,
+  delta: GroupStateDelta,
+): GroupStateResponse {
+  const tasks = byId(prev.tasks, (t) => t.id)
+  for (const id of delta.removedTaskIds) tasks.delete(id)
+  for (const task of delta.tasks) tasks.set(task.id, task)
+
+  let leaderboard = prev.leaderboard
+  if (leaderboard && delta.leaderboard) {
+    const rows = byId(leaderboard, (row) => row.user.id)
+    for (const row of delta.leaderboard) rows.set(row.user.id, row)
+    leaderboard = sortLeaderboard([...rows.values()])
+  }
+
+  return {
+    ...prev,
+    version: delta.version,
+    group: delta.group,
+    pet: delta.pet,
+    tasks: [...tasks.values()].sort((a, b) => a.dueAt.localeCompare(b.dueAt)),
+    leaderboard,
+    recentEvents: [...delta.newEvents, ...prev.recentEvents].slice(0, RECENT_EVENTS_LIMIT),
+    penaltiesPending: delta.penaltiesPending,
+  }
+}
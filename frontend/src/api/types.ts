@@ -25,6 +25,8 @@ export type GroupSummary = {
   petHealth?: number | null
   petMaxHealth?: number | null
   isCreator?: boolean
+  // A background pass will apply penalties for deadlines that just passed.
+  penaltiesPending?: boolean
 }
 
 export type MyGroupsResponse = { groups: GroupSummary[] }
@@ -71,6 +73,11 @@ export type EventOut = {
   target?: UserRef | null
 }
 
+export type EventPage = {
+  events: EventOut[]
+  nextCursor?: string | null
+}
+
 export type LeaderboardEntry = {
   user: UserRef
   doneCount: number
@@ -78,14 +85,34 @@ export type LeaderboardEntry = {
 }
 
 export type GroupStateResponse = {
+  sync: 'full'
+  // Send back as `since` to receive a GroupStateDelta instead of a full snapshot.
+  version: number
   group: { id: string; name: string; mode: GroupMode; class: ClassRef }
   pet: PetState
   tasks: TaskState[]
   leaderboard?: LeaderboardEntry[] | null
   recentEvents: EventOut[]
+  // Pass to getGroupEvents to load history older than recentEvents.
+  recentEventsCursor?: string | null
+  // Penalties for passed deadlines are still being applied; a newer version will follow.
+  penaltiesPending?: boolean
   viewer?: { role: GroupRole } // optional until backend adds it
 }
 
+export type GroupStateDelta = {
+  sync: 'delta'
+  version: number
+  since: number
+  group: GroupStateResponse['group']
+  pet: PetState
+  tasks: TaskState[]
+  removedTaskIds: string[]
+  leaderboard?: LeaderboardEntry[] | null
+  newEvents: EventOut[]
+  penaltiesPending?: boolean
+}
+
 export type CreateTaskRequest = {
   title: string
   type: TaskType
@@ -104,6 +131,8 @@ export type CompleteTaskRequest = {
 export type NudgeRequest = { toUserId: string; taskId?: string; message?: string }
 export type NudgeResponse = { ok: boolean }
 
+export type StreamTokenResponse = { streamToken: string; expiresIn: number }
+
 // Auth types
 export type RegisterRequest = {
   email: string
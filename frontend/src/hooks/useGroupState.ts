@@ -1,16 +1,94 @@
-import { useQuery } from '@tanstack/react-query'
+import { useEffect, useRef, useState } from 'react'
+import { useQuery, useQueryClient } from '@tanstack/react-query'
 import { useNavigate } from 'react-router-dom'
 
-import { api } from '../api/client'
+import { ApiError, api } from '../api/client'
+import { applyGroupStateDelta } from '../api/groupStateDelta'
+import type { GroupStateResponse } from '../api/types'
 import { clearAuthToken } from '../auth/storage'
 
+// While the live stream is connected, polling is only a safety net.
+const LIVE_REFETCH_INTERVAL = 120000
+const POLL_REFETCH_INTERVAL = 15000
+// Penalties are being applied in the background; pick them up shortly.
+const PENDING_REFETCH_INTERVAL = 3000
+// Delay before reopening a stream the browser gave up on (e.g. its stream token expired).
+const STREAM_RETRY_DELAY = 5000
+
 export function useGroupState(groupId: string) {
   const navigate = useNavigate()
+  const queryClient = useQueryClient()
+  const [live, setLive] = useState(false)
+  // Newest version announced by the stream, to catch a fetch that returned an older state.
+  const streamVersion = useRef<number | null>(null)
+
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return
+
+    let source: EventSource | null = null
+    let retry: ReturnType<typeof setTimeout> | undefined
+    let closed = false
+
+    const connect = async () => {
+      let url: string
+      try {
+        url = await api.groupStreamUrl(groupId)
+      } catch (error) {
+        // Logged out or not a member: stay on polling. Network/server trouble: try again.
+        const status = error instanceof ApiError ? error.status : 0
+        if (!closed && (status === 0 || status >= 500)) {
+          retry = setTimeout(() => void connect(), STREAM_RETRY_DELAY)
+        }
+        return
+      }
+      if (closed) return
+
+      const current = new EventSource(url)
+      source = current
+      streamVersion.current = null
+      current.addEventListener('open', () => setLive(true))
+      current.addEventListener('error', () => {
+        setLive(false)
+        // EventSource retries dropped connections itself (same URL), but gives up on an HTTP
+        // error such as the 401 once its stream token has expired: fetch a new token then.
+        if (current.readyState === EventSource.CLOSED && !closed) {
+          retry = setTimeout(() => void connect(), STREAM_RETRY_DELAY)
+        }
+      })
+      current.addEventListener('version', (e) => {
+        const { version } = JSON.parse((e as MessageEvent<string>).data) as { version: number }
+        streamVersion.current = version
+        // Compare every event, the first one included (it covers changes made between the state
+        // fetch and the stream connecting, and across reconnects), with the cached state.
+        const cached = queryClient.getQueryData<GroupStateResponse>(['groupState', groupId])
+        if (cached && cached.version !== version) {
+          void queryClient.invalidateQueries({ queryKey: ['groupState', groupId] })
+        }
+      })
+    }
 
-  return useQuery({
+    void connect()
+    return () => {
+      closed = true
+      clearTimeout(retry)
+      source?.close()
+      setLive(false)
+    }
+  }, [groupId, queryClient])
+
+  const query = useQuery({
     queryKey: ['groupState', groupId],
-    queryFn: () => api.getGroupState(groupId),
-    refetchInterval: 15000,
+    queryFn: async (): Promise<GroupStateResponse> => {
+      // Ask only for what changed since the cached snapshot; the server may still answer
+      // with a full snapshot when the gap is too large.
+      const prev = queryClient.getQueryData<GroupStateResponse>(['groupState', groupId])
+      const res = await api.getGroupState(groupId, prev?.version)
+      return res.sync === 'delta' && prev ? applyGroupStateDelta(prev, res) : (res as GroupStateResponse)
+    },
+    refetchInterval: (query) => {
+      if (query.state.data?.penaltiesPending && !live) return PENDING_REFETCH_INTERVAL
+      return live ? LIVE_REFETCH_INTERVAL : POLL_REFETCH_INTERVAL
+    },
     retry: (failureCount, error) => {
       // Don't retry on 401 - token expired/invalid
       if (error instanceof Error && 'status' in error && (error as { status: number }).status === 401) {
@@ -21,5 +99,14 @@ export function useGroupState(groupId: string) {
       return failureCount < 3
     },
   })
-}
 
+  // A fetch started before the stream's first event can land with an older version.
+  const version = query.data?.version
+  useEffect(() => {
+    if (version !== undefined && streamVersion.current !== null && version < streamVersion.current) {
+      void queryClient.invalidateQueries({ queryKey: ['groupState', groupId] })
+    }
+  }, [version, groupId, queryClient])
+
+  return query
+}